@@ -1,10 +1,23 @@
 # app.py - SIMPLIFIED CORRECT VERSION
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import json
-from course_data import get_course_catalog
-from recommender import CareerRecommender, create_learning_path, generate_json_output
+import os
+import time
+from collections import OrderedDict
+from catalog_store import SCORING_COLUMNS, open_catalog_store
+from json_output import render_json_output
+from model_store import get_recommender, cache_stats
+from skill_vocab import parse_skills
+from user_profile import UserProfile
+import instrumentation
+
+TOP_N_CHOICES = [10, 25, 50, 100]
+RESULTS_PER_PAGE = 10
+SESSION_RESULTS = 8  # Profiles whose results a session keeps
+RENDER_HISTORY = 50  # Reruns shown in the diagnostics chart
+
+# Newer Streamlit reruns just a fragment when its own widgets change; older versions rerun the page
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
 
 # Configure the page
 st.set_page_config(
@@ -13,21 +26,36 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def load_recommender():
+    """Fitted recommender shared by all sessions; loaded from disk on cold start"""
+    # SMARTCAREER_CATALOG may point at a SQLite/Parquet/Arrow catalog; defaults to the in-code list
+    catalog_store = open_catalog_store(os.environ.get('SMARTCAREER_CATALOG', 'memory'))
+    with instrumentation.stage('load_catalog'):
+        courses_df = catalog_store.load(SCORING_COLUMNS)
+    return get_recommender(courses_df, catalog_store=catalog_store)
+
 def main():
+    started = time.perf_counter()
+    
     # Header
     st.title("🎯 SmartCareer AI")
     st.markdown("### Personalized Learning Path Recommender")
     st.markdown("Get course recommendations based on your education, skills, and career goals")
     
-    # Initialize data
-    courses_df = get_course_catalog()
-    recommender = CareerRecommender(courses_df)
+    # Initialize data (built once per process, not on every rerun)
+    recommender = load_recommender()
+    
+    # Per-request timings for this session only; off by default
+    debug = st.sidebar.checkbox("🔧 Debug panel", help="Show per-stage timings for each request")
+    sample_stacks = debug and st.sidebar.checkbox("Sample stacks", help="Also run the sampling profiler (slower)")
     
     # ONLY ONE INPUT METHOD - User Profile Form
-    show_user_input(recommender)
+    source = show_user_input(recommender, debug, sample_stacks)
+    show_diagnostics(started, source)
 
-def show_user_input(recommender):
-    """Show ONLY the required user profile input form"""
+def show_user_input(recommender, debug=False, sample_stacks=False):
+    """Show ONLY the required user profile input form; returns where the shown results came from"""
     st.header("📝 Enter Your Profile")
     
     col1, col2 = st.columns(2)
@@ -65,39 +93,113 @@ def show_user_input(recommender):
         # OPTIONAL: Preferred study duration
         study_duration = st.selectbox("Preferred Study Duration (Optional)", 
             ["", "1-3 months", "3-6 months", "6-12 months", "12+ months"])
+        
+        top_n = st.selectbox("Number of Recommendations", TOP_N_CHOICES)
     
     # Process skills
-    technical_skills_list = [skill.strip().lower() for skill in technical_skills.split(',') if skill.strip()]
-    soft_skills_list = [skill.strip().lower() for skill in soft_skills.split(',') if skill.strip()]
+    technical_skills_list = parse_skills(technical_skills)
+    soft_skills_list = parse_skills(soft_skills)
+    
+    # Create user profile
+    user_profile = {
+        'education': education,
+        'major': major,
+        'technical_skills': technical_skills_list,
+        'soft_skills': soft_skills_list,
+        'target_domain': target_domain if target_domain else None,
+        'study_duration': study_duration if study_duration else None
+    }
+    key = results_key(recommender, user_profile, top_n)
     
+    source = 'kept from an earlier run'
     if st.button("🚀 Get Recommendations", type="primary", use_container_width=True):
         if not technical_skills_list:
             st.error("Please enter at least one technical skill")
-            return
-            
-        # Create user profile
-        user_profile = {
-            'education': education,
-            'technical_skills': technical_skills_list,
-            'soft_skills': soft_skills_list,
-            'target_domain': target_domain if target_domain else None,
-            'study_duration': study_duration if study_duration else None
-        }
-        
-        with st.spinner("🤖 Analyzing your profile and generating recommendations..."):
-            recommendations = recommender.generate_recommendations(user_profile, top_n=10)
-            learning_path = create_learning_path(recommendations)
-            
-            display_recommendations(recommendations, learning_path, user_profile)
+            return 'none'
+        source = get_results(recommender, user_profile, top_n, key, sample_stacks)
+        if st.session_state.get('active_results') != key:
+            st.session_state['active_results'] = key
+            st.session_state['page'] = 0
+    
+    # Widget changes rerun the script; the last results stay on screen without being recomputed
+    entry = st.session_state.get('results', {}).get(st.session_state.get('active_results'))
+    if entry is None:
+        return 'none'
+    if st.session_state['active_results'] != key:
+        st.info("Your inputs (or the course catalog) changed since these results. Press Get Recommendations to update them.")
+    display_recommendations(entry)
+    
+    if debug:
+        show_debug_panel(entry['trace'])
+    return source
 
-def display_recommendations(recommendations, learning_path, user_profile):
-    """Display the required outputs"""
-    st.header("🎯 Your Personalized Learning Path")
+def results_key(recommender, user_profile, top_n):
+    """Session cache key: the normalized profile plus everything else the results depend on"""
+    return (UserProfile.of(user_profile), user_profile['study_duration'], top_n, recommender.catalog_version)
+
+def get_results(recommender, user_profile, top_n, key, sample_stacks=False):
+    """Store this profile's results in session state unless already there; returns 'computed' or 'session cache'"""
+    results = st.session_state.setdefault('results', OrderedDict())
+    if key in results:
+        results.move_to_end(key)
+        return 'session cache'
     
-    # 1. Ranked list of recommendations
-    st.subheader("📋 Recommended Courses & Certifications")
+    with st.spinner("🤖 Analyzing your profile and generating recommendations..."):
+        with instrumentation.trace('recommendations', profile=sample_stacks) as request_trace:
+            recommendations = recommender.generate_recommendations(user_profile, top_n=top_n)
+            learning_path = recommender.plan_learning_path(user_profile)
+            # Serialized once here; reruns show the stored text
+            with instrumentation.stage('json_dumps'):
+                json_text = render_json_output(recommendations, learning_path, indent=2,
+                                               fragments=recommender.json_fragments).decode('ascii')
+    
+    results[key] = {'recommendations': recommendations, 'learning_path': learning_path,
+                    'json_text': json_text, 'trace': request_trace}
+    while len(results) > SESSION_RESULTS:
+        results.popitem(last=False)
+    return 'computed'
+
+def show_debug_panel(request_trace):
+    """Per-stage breakdown of the last request"""
+    with st.expander("🔧 Debug: where the time went", expanded=True):
+        st.metric("Total", f"{request_trace.seconds * 1000:.1f} ms")
+        breakdown = pd.DataFrame(request_trace.breakdown())
+        if not breakdown.empty:
+            breakdown['share'] = (breakdown['share'] * 100).round(1).astype(str) + '%'
+            st.dataframe(breakdown.round({'ms': 3}), use_container_width=True, hide_index=True)
+        st.write("**Counters**")
+        st.json(dict(request_trace.counters))
+        st.write("**Model loading (this process)**")
+        st.json(cache_stats())
+        if request_trace.profile is not None:
+            st.write("**Hottest functions (share of samples)**")
+            st.code('\n'.join(f"{share:6.1%}  {name}" for name, share in request_trace.profile.top(15)))
+
+def show_diagnostics(started, source):
+    """Render time of this rerun and of recent ones, and where the results came from"""
+    elapsed = (time.perf_counter() - started) * 1000
+    history = st.session_state.setdefault('render_ms', [])
+    history.append(elapsed)
+    del history[:-RENDER_HISTORY]
+    with st.expander("⏱️ Diagnostics"):
+        col1, col2 = st.columns(2)
+        col1.metric("This rerun", f"{elapsed:.1f} ms")
+        col2.metric("Results", source)
+        st.caption(f"Profiles cached in this session: {len(st.session_state.get('results', {}))}")
+        if len(history) > 1:
+            st.line_chart(pd.DataFrame({'render ms': history}))
+
+def turn_page(step):
+    st.session_state['page'] = st.session_state.get('page', 0) + step
+
+@fragment
+def show_recommendation_page(recommendations):
+    """One page of the ranked list; only that page's expanders are built"""
+    pages = max(1, -(-len(recommendations) // RESULTS_PER_PAGE))
+    page = min(max(st.session_state.get('page', 0), 0), pages - 1)
+    start = page * RESULTS_PER_PAGE
     
-    for i, rec in enumerate(recommendations, 1):
+    for i, rec in enumerate(recommendations[start:start + RESULTS_PER_PAGE], start + 1):
         with st.expander(f"{i}. {rec['title']} - {rec['match_score']}% Match"):
             col1, col2 = st.columns(2)
             with col1:
@@ -112,9 +214,32 @@ def display_recommendations(recommendations, learning_path, user_profile):
             # 2. Short rationale for each recommendation (REQUIRED)
             st.write(f"**🤔 Why this course?** {rec['justification']}")
     
+    if pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        col1.button("◀ Previous", on_click=turn_page, args=(-1,), disabled=page == 0, use_container_width=True)
+        col2.caption(f"Page {page + 1} of {pages} ({len(recommendations)} courses)")
+        col3.button("Next ▶", on_click=turn_page, args=(1,), disabled=page == pages - 1, use_container_width=True)
+
+def display_recommendations(entry):
+    """Display the required outputs of one stored result"""
+    recommendations, learning_path = entry['recommendations'], entry['learning_path']
+    st.header("🎯 Your Personalized Learning Path")
+    
+    # 1. Ranked list of recommendations
+    st.subheader("📋 Recommended Courses & Certifications")
+    show_recommendation_page(recommendations)
+    
     # 3. Suggested learning timeline (REQUIRED)
     st.subheader("🗓️ Suggested Learning Timeline")
     
+    # Planned order: every course's prerequisites are covered by your skills or earlier steps
+    if learning_path.get('path'):
+        st.caption(f"Planned path: {learning_path['total_weeks']:g} of {learning_path['budget_weeks']:g} weeks")
+        for step in learning_path['path']:
+            new_skills = f" — learn {', '.join(step['new_skills'][:4])}" if step['new_skills'] else ""
+            brush_up = f" (brush up on {', '.join(step['brush_up'])} first)" if step['brush_up'] else ""
+            st.write(f"Weeks {step['start_week']:g}-{step['end_week']:g}: **{step['title']}** ({step['purpose']}){new_skills}{brush_up}")
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -134,8 +259,7 @@ def display_recommendations(recommendations, learning_path, user_profile):
     
     # 4. JSON output (REQUIRED)
     st.subheader("📄 JSON Output")
-    json_output = generate_json_output(recommendations, learning_path)
-    st.code(json.dumps(json_output, indent=2), language='json')
+    st.code(entry['json_text'], language='json')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,320 @@
+# batch_recommend.py - Streaming Bulk Recommendations for CSV/JSONL Profile Files
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from catalog_store import SCORING_COLUMNS, open_catalog_store
+from json_output import encode_payload, render_json_output
+from model_store import get_recommender
+from recommender import create_learning_path, generate_json_output
+
+CHUNK_SIZE = 1000  # Profiles read, scored and written together
+DEFAULT_TOP_N = 10
+PROFILE_FIELDS = ('technical_skills', 'experience_years', 'target_domain', 'major')
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def parse_skills(value):
+    """Skill list from a JSON list, a JSON-encoded list, or a ';'/','-separated string"""
+    if _is_missing(value):
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('['):
+            value = json.loads(text)
+        else:
+            separator = ';' if ';' in text else ','
+            return [skill.strip() for skill in text.split(separator) if skill.strip()]
+    if not isinstance(value, list) or not all(isinstance(skill, str) for skill in value):
+        raise ValueError("'technical_skills' must be a list of strings")
+    return value
+
+
+def parse_profile(row):
+    """Profile dict (as in sample_profiles) from one CSV row or JSONL object"""
+    experience = row.get('experience_years')
+    experience = 0 if _is_missing(experience) or experience == '' else float(experience)
+    profile = {'technical_skills': parse_skills(row.get('technical_skills')), 'experience_years': experience}
+    for key in ('target_domain', 'major'):
+        value = row.get(key)
+        profile[key] = '' if _is_missing(value) else str(value)
+    return profile
+
+
+def decode_row(row):
+    """Row dict of a CSV row (already a dict) or a raw JSONL line"""
+    if isinstance(row, str):
+        row = json.loads(row)  # json.JSONDecodeError is a ValueError
+    if not isinstance(row, dict):
+        raise ValueError(f"row must be a JSON object, not {type(row).__name__}")
+    return row
+
+
+def read_profiles(path, chunk_size=CHUNK_SIZE, skip=0):
+    """Yield lists of raw rows from a CSV or JSONL file, skipping the first ``skip`` rows
+
+    CSV rows come as dicts, JSONL rows as undecoded lines, so a malformed
+    line becomes one error record in recommend_chunk (see decode_row)
+    instead of stopping the job.
+    """
+    if path.lower().endswith('.csv'):
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False,
+                             skiprows=lambda i: 0 < i <= skip)
+        for frame in reader:
+            yield frame.to_dict('records')
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = (line for line in f if line.strip())
+            lines = islice(lines, skip, None)
+            while True:
+                chunk = list(islice(lines, chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+
+
+def load_recommender(catalog=None):
+    """Fitted recommender for a catalog location ('memory', SQLite or Parquet/Arrow file)"""
+    catalog_store = open_catalog_store(catalog or os.environ.get('SMARTCAREER_CATALOG', 'memory'))
+    return get_recommender(catalog_store.load(SCORING_COLUMNS), catalog_store=catalog_store)
+
+
+def recommend_chunk(recommender, rows, top_n, first_row, id_field='id', encoder=None):
+    """(generate_json_output-shaped records tagged with the profile id, error count) for one chunk
+
+    Rows that cannot be parsed produce an {"profile_id", "error"} record
+    instead of failing the whole job. With an ``encoder`` ('json' or
+    'orjson') the records come back as encoded JSON lines; 'json' lines
+    are assembled from the recommender's pre-encoded course fragments.
+    """
+    ids, profiles, errors = [], [], {}
+    for i, row in enumerate(rows):
+        profile_id = None
+        try:
+            row = decode_row(row)
+            profile_id = row.get(id_field)
+            profiles.append(parse_profile(row))
+        except (ValueError, TypeError) as e:
+            errors[i] = str(e)
+        ids.append(str(first_row + i) if _is_missing(profile_id) or profile_id == '' else str(profile_id))
+    scored = iter(recommender.generate_recommendations_batch(profiles, top_n) if profiles else [])
+    records = []
+    for i, profile_id in enumerate(ids):
+        if i in errors:
+            record = {'profile_id': profile_id, 'error': errors[i]}
+            records.append(encode_payload(record, encoder) if encoder else record)
+            continue
+        recommendations = next(scored)
+        learning_path = create_learning_path(recommendations)
+        if encoder == 'json':
+            # Same bytes as json.dumps({'profile_id': ..., **output})
+            output = render_json_output(recommendations, learning_path, fragments=recommender.json_fragments)
+            records.append(b'{"profile_id": ' + encode_payload(profile_id) + b', ' + output[1:])
+            continue
+        record = {'profile_id': profile_id, **generate_json_output(recommendations, learning_path)}
+        records.append(encode_payload(record, encoder) if encoder else record)
+    return records, len(errors)
+
+
+# Worker processes load the recommender once (from the disk artifact when one exists)
+_worker_recommender = None
+
+
+def _init_worker(catalog):
+    global _worker_recommender
+    _worker_recommender = load_recommender(catalog)
+
+
+def _worker_chunk(rows, top_n, first_row, id_field, encoder):
+    return recommend_chunk(_worker_recommender, rows, top_n, first_row, id_field, encoder)
+
+
+class JSONLWriter:
+    """Appends encoded records to one JSONL file; a checkpoint remembers the committed byte length"""
+
+    def __init__(self, path, committed=None, encoder='json'):
+        self.path = path
+        self.encoder = encoder  # Records arrive already encoded by recommend_chunk
+        if committed is None:
+            self.file = open(path, 'wb')
+        else:
+            self.file = open(path, 'r+b' if os.path.exists(path) else 'wb')
+            self.file.truncate(committed)  # Drop output written after the last checkpoint
+            self.file.seek(committed)
+
+    def write(self, chunk_index, records):
+        self.file.write(b''.join(record + b'\n' for record in records))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes each chunk as its own part file in a directory, so a resumed job just rewrites later parts"""
+
+    encoder = None  # Records arrive as dicts
+
+    def __init__(self, path, committed=None, encoder=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from e
+        self.pa = pyarrow
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        timeline = pyarrow.list_(pyarrow.struct([('course_title', pyarrow.string()), ('reason', pyarrow.string())]))
+        self.schema = pyarrow.schema([
+            ('profile_id', pyarrow.string()),
+            ('user_recommendations', pyarrow.list_(pyarrow.struct([
+                ('course_title', pyarrow.string()), ('provider', pyarrow.string()),
+                ('match_score', pyarrow.int64()), ('justification', pyarrow.string()),
+                ('timeline', pyarrow.string()), ('career_path', pyarrow.string())
+            ]))),
+            ('learning_timeline', pyarrow.struct([
+                ('short_term', timeline), ('medium_term', timeline), ('long_term', timeline)
+            ])),
+            ('error', pyarrow.string())
+        ])
+
+    def write(self, chunk_index, records):
+        table = self.pa.Table.from_pylist(records, schema=self.schema)
+        target = os.path.join(self.path, f"part-{chunk_index:06d}.parquet")
+        self.pa.parquet.write_table(table, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        return None
+
+    def close(self):
+        pass
+
+
+def open_writer(path, committed=None, encoder='json'):
+    """Parquet part-file directory for '*.parquet' paths, JSONL otherwise"""
+    if path.lower().endswith('.parquet'):
+        return ParquetWriter(path, committed)
+    return JSONLWriter(path, committed, encoder)
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+
+
+def run(input_path, output_path, top_n=DEFAULT_TOP_N, chunk_size=CHUNK_SIZE, workers=1, catalog=None,
+        checkpoint_path=None, resume=True, id_field='id', progress=sys.stderr, encoder='json'):
+    """Stream profiles from input_path to recommendation records in output_path
+
+    At most ``2 * workers`` chunks are in flight, so memory stays bounded by
+    the chunk size rather than the file size. Chunks are written in input
+    order and a checkpoint is committed after each one; rerunning the same
+    job resumes after the last committed chunk. ``encoder`` ('json' or
+    'orjson') applies to JSONL output. Returns a summary dict.
+    """
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+    checkpoint = read_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and (checkpoint['input'] != os.path.abspath(input_path)
+                                   or checkpoint['chunk_size'] != chunk_size):
+        raise ValueError(f"{checkpoint_path} belongs to a different job; remove it or pass resume=False")
+    if checkpoint is None:
+        checkpoint = {'input': os.path.abspath(input_path), 'chunk_size': chunk_size,
+                      'rows_done': 0, 'chunks_done': 0, 'output_bytes': None, 'errors': 0}
+        writer = open_writer(output_path, encoder=encoder)
+    else:
+        writer = open_writer(output_path, checkpoint['output_bytes'] or 0, encoder)
+    resumed_from = checkpoint['rows_done']
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalog,))
+        submit = lambda rows, first: executor.submit(_worker_chunk, rows, top_n, first, id_field, writer.encoder)
+    else:
+        executor, recommender = None, load_recommender(catalog)
+        submit = lambda rows, first: recommend_chunk(recommender, rows, top_n, first, id_field, writer.encoder)
+
+    started = time.perf_counter()
+
+    def commit(result):
+        records, errors = result
+        checkpoint['output_bytes'] = writer.write(checkpoint['chunks_done'], records)
+        checkpoint['chunks_done'] += 1
+        checkpoint['rows_done'] += len(records)
+        checkpoint['errors'] += errors
+        write_checkpoint(checkpoint_path, checkpoint)
+        if progress is not None:
+            done = checkpoint['rows_done'] - resumed_from
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            print(f"⏳ {checkpoint['rows_done']:,} profiles ({rate:,.0f}/s)", file=progress, flush=True)
+
+    try:
+        pending = deque()
+        first_row = checkpoint['rows_done']
+        for rows in read_profiles(input_path, chunk_size, skip=first_row):
+            pending.append(submit(rows, first_row))
+            first_row += len(rows)
+            while len(pending) > (2 * workers if executor else 0):
+                result = pending.popleft()
+                commit(result.result() if executor else result)
+        while pending:
+            result = pending.popleft()
+            commit(result.result() if executor else result)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    processed = checkpoint['rows_done'] - resumed_from
+    return {
+        'profiles': checkpoint['rows_done'],
+        'processed': processed,
+        'resumed_from': resumed_from,
+        'errors': checkpoint['errors'],
+        'seconds': seconds,
+        'profiles_per_second': processed / seconds if seconds > 0 else None
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recommend courses for every profile in a CSV/JSONL file")
+    parser.add_argument('input', help="profiles as .csv (technical_skills separated by ';') or .jsonl")
+    parser.add_argument('output', help="records as .jsonl, or a .parquet directory of part files")
+    parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help="scoring processes")
+    parser.add_argument('--catalog', default=None, help="catalog location (default: SMARTCAREER_CATALOG or memory)")
+    parser.add_argument('--id-field', default='id', help="column holding the learner id")
+    parser.add_argument('--checkpoint', default=None, help="checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint and start over")
+    parser.add_argument('--encoder', choices=['json', 'orjson'], default='json', help="JSONL record encoder")
+    args = parser.parse_args()
+
+    summary = run(args.input, args.output, args.top_n, args.chunk_size, args.workers, args.catalog,
+                  args.checkpoint, not args.restart, args.id_field, encoder=args.encoder)
+    print(f"✅ {summary['processed']:,} profiles in {summary['seconds']:.1f}s "
+          f"({summary['profiles_per_second'] or 0:,.0f}/s), {summary['errors']} errors -> {args.output}")
@@ -0,0 +1,312 @@
+# benchmark.py - Recommender Hot-Path Benchmarks (JSON results)
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from recommender import CareerRecommender, create_learning_path, generate_json_output
+from synthetic_data import default_skill_count, generate_catalog, generate_profiles
+from user_profile import UserProfile
+from vector_index import Projection, build_index, load_index, save_index
+
+PERCENTILES = [50, 90, 99]
+HEAVY_MODULES = ('sklearn', 'pandas', 'scipy', 'plotly', 'streamlit', 'pyarrow')
+
+# Run in a fresh interpreter: a service worker's startup, from imports to its first response
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import service
+imported = time.perf_counter()
+recommender = service.preload_recommender()
+loaded = time.perf_counter()
+from json_output import encode_payload
+from sample_profiles import get_sample_profiles
+recommendations = recommender.generate_recommendations(get_sample_profiles()[0])
+encode_payload(service.generate_json_output(recommendations, service.create_learning_path(recommendations)))
+answered = time.perf_counter()
+print(json.dumps({
+    'import': imported - started, 'load_model': loaded - imported, 'first_response': answered - loaded,
+    'modules': {name: name in sys.modules for name in %r}
+}))
+""" % (HEAVY_MODULES,)
+
+
+def summarize(durations, peak_memory=None):
+    """Latency percentiles (ms), throughput and peak traced memory for one phase"""
+    durations = np.asarray(durations, dtype=float)
+    total = float(durations.sum())
+    summary = {
+        'calls': len(durations),
+        'total_seconds': total,
+        'mean_ms': float(durations.mean() * 1000),
+        'max_ms': float(durations.max() * 1000),
+        'throughput_per_second': len(durations) / total if total > 0 else None,
+        'peak_memory_bytes': peak_memory
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(durations, p) * 1000)
+    return summary
+
+
+def time_calls(fn, calls):
+    """Wall-clock seconds for each fn(*args) in calls"""
+    durations = []
+    for args in calls:
+        started = time.perf_counter()
+        fn(*args)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def peak_memory(fn, args):
+    """Peak bytes allocated by one fn(*args) call (traced separately so timings stay clean)"""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_phase(fn, calls, trace_memory=True):
+    calls = list(calls)
+    durations = time_calls(fn, calls)
+    return summarize(durations, peak_memory(fn, calls[0]) if trace_memory else None)
+
+
+def benchmark_catalog(n_courses, n_profiles, seed=0, top_n=10, match_pairs=1000, train_repeat=3, trace_memory=True,
+                      n_shards=None, vector_k=50, n_probes=(1, 4, 16, 64)):
+    """Time each hot path on one synthetic catalog"""
+    started = time.perf_counter()
+    courses = generate_catalog(n_courses, seed=seed)
+    profiles = generate_profiles(n_profiles, seed=seed + 1, n_courses=n_courses)
+    generate_seconds = time.perf_counter() - started
+
+    phases = {}
+    started = time.perf_counter()
+    recommender = CareerRecommender(courses, auto_compact=False, cache_size=0, n_shards=n_shards)
+    phases['build_recommender'] = summarize([time.perf_counter() - started])
+
+    phases['train_model'] = run_phase(recommender._train_model, [(courses,)] * train_repeat, trace_memory)
+
+    rng = np.random.default_rng(seed)
+    pair_profiles = rng.integers(0, n_profiles, match_pairs)
+    pair_courses = courses.iloc[rng.integers(0, n_courses, match_pairs)].to_dict('records')
+    phases['calculate_match_score'] = run_phase(
+        recommender.calculate_match_score,
+        [(profiles[p], course) for p, course in zip(pair_profiles.tolist(), pair_courses)],
+        trace_memory
+    )
+
+    phases['generate_recommendations'] = run_phase(
+        recommender.generate_recommendations, [(p, top_n) for p in profiles], trace_memory
+    )
+    batch = run_phase(recommender.generate_recommendations_batch, [(profiles, top_n)], trace_memory)
+    batch['profiles_per_second'] = n_profiles / batch['total_seconds']
+    phases['generate_recommendations_batch'] = batch
+
+    state = recommender._state
+    ranked = state.scoring_engine.top_batch([UserProfile.of(p) for p in profiles], top_n)
+    phases['materialize_top_n'] = run_phase(state.course_rows, [(rows,) for rows, _ in ranked], trace_memory)
+    
+    recommendations = [recommender.generate_recommendations(p, top_n) for p in profiles]
+    phases['create_learning_path'] = run_phase(
+        create_learning_path, [(recs,) for recs in recommendations], trace_memory
+    )
+    phases['generate_json_output'] = run_phase(
+        generate_json_output, [(recs, create_learning_path(recs)) for recs in recommendations], trace_memory
+    )
+    vector_index = benchmark_vector_index(recommender, profiles, vector_k, n_probes) if vector_k else None
+    recommender.close()
+
+    return {
+        'n_courses': n_courses,
+        'n_profiles': n_profiles,
+        'n_skills': default_skill_count(n_courses),
+        'top_n': top_n,
+        'n_shards': n_shards,
+        'generate_seconds': generate_seconds,
+        'metadata_bytes_per_course': {
+            'dataframe': int(courses.memory_usage(deep=True).sum()) / n_courses,
+            'course_table': state.courses.nbytes() / n_courses
+        },
+        'phases': phases,
+        'vector_index': vector_index
+    }
+
+
+def benchmark_vector_index(recommender, profiles, k=50, n_probes=(1, 4, 16, 64)):
+    """Build time, size, QPS and recall@k of the IVF index against the exact index
+
+    Both indexes hold the same projected vectors of the recommender's TF-IDF
+    course rows; queries are the profiles' texts. Recall is the share of the
+    exact top k that the IVF search also returns.
+    """
+    state = recommender._state
+    started = time.perf_counter()
+    projection = Projection.fit(state.course_features)
+    vectors = projection.transform(state.course_features)
+    project_seconds = time.perf_counter() - started
+    queries = projection.transform(state.vectorizer.transform([UserProfile.of(p).text() for p in profiles]))
+
+    results = {'k': k, 'dim': projection.dim, 'project_seconds': project_seconds, 'n_queries': len(queries)}
+    exact_ids = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for kind in ('exact', 'ivf'):
+            started = time.perf_counter()
+            index = build_index(kind, vectors)
+            build_seconds = time.perf_counter() - started
+            path = save_index(index, os.path.join(tmp_dir, f"{kind}.vectors"))
+            started = time.perf_counter()
+            index = load_index(path)  # Searched memory-mapped, as a server would after a restart
+            stats = {'build_seconds': build_seconds, 'load_mmap_ms': (time.perf_counter() - started) * 1000,
+                     'file_bytes': os.path.getsize(path)}
+            for n_probe in (n_probes if kind == 'ivf' else (None,)):
+                started = time.perf_counter()
+                ids, _ = index.search(queries, k, n_probe=n_probe)
+                seconds = time.perf_counter() - started
+                if exact_ids is None:
+                    exact_ids = ids
+                recall = np.mean([len(np.intersect1d(a[a >= 0], b[b >= 0])) / max(1, (a >= 0).sum())
+                                  for a, b in zip(exact_ids, ids)])
+                search = {'qps': len(queries) / seconds, f'recall@{k}': float(recall)}
+                if n_probe is None:
+                    stats.update(search)
+                else:
+                    stats.setdefault('n_probe', {})[n_probe] = search
+            results[kind] = stats
+    return results
+
+
+def environment():
+    """Versions and commit the results were produced with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scikit-learn': sklearn.__version__
+    }
+
+
+def cold_start(runs=5):
+    """Import, model-load and first-response times of fresh worker processes (served catalog, disk artifact)
+
+    One unmeasured run first makes sure the model artifact exists, so the
+    measured runs see a warm disk cache but a cold interpreter.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs + 1):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT], capture_output=True, text=True,
+                                check=True, cwd=package_dir).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process'] = time.perf_counter() - started
+        samples.append(sample)
+    samples = samples[1:]
+    phases = {phase: summarize([s[phase] for s in samples])
+              for phase in ('import', 'load_model', 'first_response', 'process')}
+    return {'runs': runs, 'phases': phases, 'modules_loaded': samples[-1]['modules']}
+
+
+def compare(baseline, current, metric='p50_ms'):
+    """Rows of (n_courses, phase, baseline value, current value, ratio) for matching runs"""
+    baseline_runs = {run['n_courses']: run for run in baseline['runs']}
+    rows = []
+    for run in current['runs']:
+        before = baseline_runs.get(run['n_courses'])
+        if before is None:
+            continue
+        for phase, stats in run['phases'].items():
+            old = before['phases'].get(phase, {}).get(metric)
+            new = stats.get(metric)
+            if old and new is not None:
+                rows.append((run['n_courses'], phase, old, new, new / old))
+    for phase, stats in current.get('cold_start', {}).get('phases', {}).items():
+        old = baseline.get('cold_start', {}).get('phases', {}).get(phase, {}).get(metric)
+        new = stats.get(metric)
+        if old and new is not None:
+            rows.append(('cold start', phase, old, new, new / old))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommender hot paths on synthetic catalogs")
+    parser.add_argument('--courses', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="catalog sizes to run (e.g. 1000 1000000 10000000)")
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--match-pairs', type=int, default=1000, help="calculate_match_score calls per catalog")
+    parser.add_argument('--train-repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shards', type=int, default=None, help="score catalogs of 500k+ courses on this many processes")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced peak-memory runs")
+    parser.add_argument('--vector-k', type=int, default=50, help="neighbours for the vector index recall/QPS run (0 to skip)")
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[1, 4, 16, 64], help="IVF cells probed per query")
+    parser.add_argument('--cold-start-runs', type=int, default=5,
+                        help="fresh worker processes to time from import to first response (0 to skip)")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="earlier results JSON to compare p50 latencies against")
+    args = parser.parse_args()
+
+    results = {'environment': environment(), 'settings': vars(args), 'runs': []}
+    for n_courses in args.courses:
+        run = benchmark_catalog(n_courses, args.profiles, args.seed, args.top_n, args.match_pairs,
+                                args.train_repeat, not args.no_memory, args.shards, args.vector_k, args.n_probe)
+        results['runs'].append(run)
+        print(f"📊 {n_courses:,} courses")
+        for phase, stats in run['phases'].items():
+            print(f"   {phase:32} p50 {stats['p50_ms']:10.3f} ms   p99 {stats['p99_ms']:10.3f} ms")
+        vectors = run['vector_index']
+        if vectors:
+            recall = f"recall@{vectors['k']}"
+            print(f"   {'vector exact':32} {vectors['exact']['qps']:10.0f} qps")
+            for n_probe, search in vectors['ivf']['n_probe'].items():
+                print(f"   {f'vector ivf n_probe={n_probe}':32} {search['qps']:10.0f} qps   {recall} {search[recall]:.3f}")
+
+    if args.cold_start_runs > 0:
+        results['cold_start'] = cold_start(args.cold_start_runs)
+        print("🧊 Cold start (fresh process, model artifact on disk)")
+        for phase, stats in results['cold_start']['phases'].items():
+            print(f"   {phase:32} p50 {stats['p50_ms']:10.3f} ms   p99 {stats['p99_ms']:10.3f} ms")
+        loaded = [name for name, present in results['cold_start']['modules_loaded'].items() if present]
+        print(f"   modules loaded: {', '.join(loaded) or 'none'}")
+
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results['max_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for n_courses, phase, old, new, ratio in compare(baseline, results):
+            flag = '⚠️' if ratio > 1.1 else '  '
+            label = f"{n_courses:,}" if isinstance(n_courses, int) else n_courses
+            print(f"{flag} {label:>10} {phase:32} {old:10.3f} -> {new:10.3f} ms  x{ratio:.2f}")
@@ -0,0 +1,65 @@
+# buffers.py - Append-Only Array Buffers for Incremental Catalog Updates
+import numpy as np
+from scipy import sparse
+
+
+class ArrayBuffer:
+    """Array with spare capacity for cheap appends along its first axis
+
+    The first ``size`` items are never written again once a view of them has
+    been handed out, so readers holding an older view are unaffected by later
+    appends. Appending after a shorter prefix than ``size`` forks a new buffer.
+    """
+
+    def __init__(self, values, dtype=None):
+        self.data = np.array(values, dtype=dtype)
+        self.size = len(self.data)
+
+    def extend(self, size, values):
+        """Buffer holding the first ``size`` items followed by ``values`` (amortized O(len(values)))"""
+        buffer = self if size == self.size else ArrayBuffer(self.data[:size])
+        needed = size + len(values)
+        if needed > len(buffer.data):
+            grown = np.empty((max(needed, 2 * len(buffer.data)),) + buffer.data.shape[1:], dtype=buffer.data.dtype)
+            grown[:size] = buffer.data[:size]
+            buffer.data = grown
+        buffer.data[size:needed] = values
+        buffer.size = needed
+        return buffer
+
+    def view(self):
+        """Zero-copy view of the filled prefix"""
+        return self.data[:self.size]
+
+
+class CsrBuffer:
+    """CSR matrix whose rows can be appended without copying the existing rows"""
+
+    def __init__(self, matrix, n_rows=None, n_columns=None, parts=None):
+        if parts is None:
+            matrix = sparse.csr_matrix(matrix)
+            # int32 indices and indptr let scipy wrap the views without converting them
+            parts = (ArrayBuffer(matrix.indptr, np.int32),
+                     ArrayBuffer(matrix.indices, np.int32),
+                     ArrayBuffer(matrix.data))
+            n_rows, n_columns = matrix.shape
+        self.indptr, self.indices, self.data = parts
+        self.n_rows, self.n_columns = n_rows, n_columns
+
+    def extend(self, n_rows, rows):
+        """Buffer holding the first ``n_rows`` rows followed by the rows of CSR matrix ``rows``"""
+        nnz = int(self.indptr.data[n_rows])
+        parts = (self.indptr.extend(n_rows + 1, rows.indptr[1:] + nnz),
+                 self.indices.extend(nnz, rows.indices),
+                 self.data.extend(nnz, rows.data))
+        n_columns = max(self.n_columns, rows.shape[1])
+        return CsrBuffer(None, n_rows + rows.shape[0], n_columns, parts)
+
+    def view(self):
+        """Zero-copy CSR matrix over this buffer's rows (later appends are not visible)"""
+        indptr = self.indptr.data[:self.n_rows + 1]
+        nnz = int(indptr[-1])
+        return sparse.csr_matrix(
+            (self.data.data[:nnz], self.indices.data[:nnz], indptr),
+            shape=(self.n_rows, self.n_columns)
+        )
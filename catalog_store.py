@@ -0,0 +1,276 @@
+# catalog_store.py - Course Catalog Storage Backends
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from course_data import get_course_records
+
+# Columns needed to fit the model, score courses and plan learning paths; the rest are only shown for the top N
+SCORING_COLUMNS = ['id', 'title', 'skills_covered', 'prerequisites', 'level', 'domain', 'career_path', 'duration']
+DISPLAY_COLUMNS = ['provider', 'cost', 'link']
+LIST_COLUMNS = ['skills_covered', 'prerequisites']
+ALL_COLUMNS = SCORING_COLUMNS + DISPLAY_COLUMNS
+
+
+def build_dictionary(courses_df):
+    """Sorted unique strings across all list columns; list items are stored as codes into it"""
+    values = set()
+    for column in LIST_COLUMNS:
+        for items in courses_df[column].tolist():
+            values.update(items)
+    return sorted(values)
+
+
+def encode_lists(lists, dictionary):
+    """(offsets, codes) int arrays for a column of string lists"""
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(items) for items in lists])
+    codes = np.fromiter((lookup[item] for items in lists for item in items), dtype=np.int32, count=offsets[-1])
+    return offsets, codes
+
+
+def decode_lists(offsets, codes, dictionary):
+    """Column of string lists from (offsets, codes)"""
+    values = np.asarray(dictionary, dtype=object)[codes].tolist()
+    return [values[start:stop] for start, stop in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+
+class CatalogStore:
+    """Source of course rows; scoring columns are loaded up front, display columns on demand"""
+
+    location = None  # Identifies the backing data, e.g. a file path
+
+    def load(self, columns=None):
+        """DataFrame of all courses restricted to ``columns`` (default: every column)"""
+        raise NotImplementedError
+
+    def fetch(self, course_ids, columns=None):
+        """DataFrame indexed by course id with ``columns`` for just the given courses"""
+        raise NotImplementedError
+
+
+class InMemoryCatalogStore(CatalogStore):
+    """The hardcoded catalog from course_data (or any list of course dicts)"""
+
+    location = 'memory'
+
+    def __init__(self, records=None):
+        self.records = get_course_records() if records is None else list(records)
+        self._by_id = {record['id']: record for record in self.records}
+
+    def load(self, columns=None):
+        return pd.DataFrame(self.records, columns=columns or ALL_COLUMNS)
+
+    def fetch(self, course_ids, columns=None):
+        columns = columns or ALL_COLUMNS
+        rows = [[self._by_id[course_id][c] for c in columns] for course_id in course_ids]
+        return pd.DataFrame(rows, columns=columns, index=pd.Index(list(course_ids), name='id'))
+
+
+class SQLiteCatalogStore(CatalogStore):
+    """SQLite file; list columns are BLOBs of int32 codes into a skill dictionary table"""
+
+    MMAP_SIZE = 1 << 30  # Let SQLite memory-map up to 1 GB of the file for reads
+
+    def __init__(self, path):
+        self.path = self.location = path
+        self._local = threading.local()
+        self._dictionary = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _connection(self):
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+            self._local.connection = connection
+        return connection
+
+    def write(self, courses_df):
+        """Replace the stored catalog with ``courses_df``"""
+        dictionary = build_dictionary(courses_df)
+        encoded = {column: encode_lists(courses_df[column].tolist(), dictionary) for column in LIST_COLUMNS}
+        scalar_columns = [c for c in ALL_COLUMNS if c not in LIST_COLUMNS]
+
+        rows = []
+        scalars = zip(*(courses_df[c].tolist() for c in scalar_columns))
+        for position, values in enumerate(scalars):
+            blobs = []
+            for column in LIST_COLUMNS:
+                offsets, codes = encoded[column]
+                blobs.append(codes[offsets[position]:offsets[position + 1]].tobytes())
+            rows.append((position, *values, *blobs))
+
+        connection = self._connection()
+        with connection:
+            connection.execute("DROP TABLE IF EXISTS courses")
+            connection.execute("DROP TABLE IF EXISTS skill_dictionary")
+            connection.execute("CREATE TABLE skill_dictionary (code INTEGER PRIMARY KEY, skill TEXT NOT NULL)")
+            connection.execute(
+                f"CREATE TABLE courses (position INTEGER PRIMARY KEY, {', '.join(scalar_columns)}, "
+                f"{', '.join(c + ' BLOB' for c in LIST_COLUMNS)})"
+            )
+            connection.execute("CREATE UNIQUE INDEX courses_id ON courses (id)")
+            connection.executemany("INSERT INTO skill_dictionary VALUES (?, ?)", enumerate(dictionary))
+            placeholders = ', '.join('?' * (len(scalar_columns) + len(LIST_COLUMNS) + 1))
+            connection.executemany(f"INSERT INTO courses VALUES ({placeholders})", rows)
+        self._dictionary = None
+        return self
+
+    def _skill_dictionary(self):
+        if self._dictionary is None:
+            cursor = self._connection().execute("SELECT skill FROM skill_dictionary ORDER BY code")
+            self._dictionary = [skill for (skill,) in cursor]
+        return self._dictionary
+
+    def _frame(self, cursor, columns, index=None):
+        """DataFrame from a cursor over ``columns``, decoding list BLOBs"""
+        rows = cursor.fetchall()
+        frame = pd.DataFrame(rows, columns=columns, index=index)
+        for column in LIST_COLUMNS:
+            if column in columns:
+                blobs = frame[column].tolist()
+                offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum([len(blob) // 4 for blob in blobs])
+                codes = np.frombuffer(b''.join(blobs), dtype=np.int32)
+                frame[column] = decode_lists(offsets, codes, self._skill_dictionary())
+        return frame
+
+    def load(self, columns=None):
+        columns = columns or ALL_COLUMNS
+        cursor = self._connection().execute(f"SELECT {', '.join(columns)} FROM courses ORDER BY position")
+        return self._frame(cursor, columns)
+
+    def fetch(self, course_ids, columns=None):
+        columns = [c for c in columns or ALL_COLUMNS if c != 'id']
+        course_ids = list(course_ids)
+        placeholders = ', '.join('?' * len(course_ids))
+        cursor = self._connection().execute(
+            f"SELECT id, {', '.join(columns)} FROM courses WHERE id IN ({placeholders})", course_ids
+        )
+        frame = self._frame(cursor, ['id'] + columns).set_index('id')
+        return frame.loc[course_ids]
+
+
+class ArrowCatalogStore(CatalogStore):
+    """Parquet (.parquet) or Arrow IPC (.arrow/.feather) file with list columns as list<int32> codes
+
+    The skill dictionary lives in the schema metadata. IPC files are memory-mapped
+    and read zero-copy; Parquet files are memory-mapped and decoded per column.
+    """
+
+    DICTIONARY_KEY = b'smartcareer.skill_dictionary'
+
+    def __init__(self, path):
+        self.path = self.location = path
+        self._display = None  # Display columns and id lookup, read on the first fetch
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    @staticmethod
+    def _pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            import pyarrow.ipc
+        except ImportError as e:
+            raise ImportError("ArrowCatalogStore needs pyarrow: pip install pyarrow") from e
+        return pyarrow
+
+    @property
+    def is_parquet(self):
+        return os.path.splitext(self.path)[1].lower() == '.parquet'
+
+    def write(self, courses_df):
+        """Replace the stored catalog with ``courses_df``"""
+        pa = self._pyarrow()
+        dictionary = build_dictionary(courses_df)
+        arrays, names = [], []
+        for column in ALL_COLUMNS:
+            if column in LIST_COLUMNS:
+                offsets, codes = encode_lists(courses_df[column].tolist(), dictionary)
+                arrays.append(pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(codes)))
+            else:
+                arrays.append(pa.array(courses_df[column].tolist()))
+            names.append(column)
+        table = pa.Table.from_arrays(arrays, names=names)
+        table = table.replace_schema_metadata({self.DICTIONARY_KEY: json.dumps(dictionary).encode('utf-8')})
+        if self.is_parquet:
+            pa.parquet.write_table(table, self.path)
+        else:
+            with pa.OSFile(self.path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        self._display = None
+        return self
+
+    def _read(self, columns):
+        pa = self._pyarrow()
+        if self.is_parquet:
+            return pa.parquet.read_table(self.path, columns=columns, memory_map=True)
+        # The mapping stays open while any zero-copy buffer read from it is alive
+        return pa.ipc.open_file(pa.memory_map(self.path)).read_all().select(columns)
+
+    def _to_frame(self, table):
+        """DataFrame from an Arrow table, decoding list<int32> code columns"""
+        dictionary = json.loads(table.schema.metadata[self.DICTIONARY_KEY])
+        data = {}
+        for name, column in zip(table.column_names, table.columns):
+            if name in LIST_COLUMNS:
+                lists = column.combine_chunks()
+                offsets = lists.offsets.to_numpy()
+                codes = lists.values.to_numpy()
+                data[name] = decode_lists(offsets - offsets[0], codes[offsets[0]:offsets[-1]], dictionary)
+            else:
+                data[name] = column.to_pylist()
+        return pd.DataFrame(data, columns=table.column_names)
+
+    def load(self, columns=None):
+        return self._to_frame(self._read(columns or ALL_COLUMNS))
+
+    def fetch(self, course_ids, columns=None):
+        columns = columns or ALL_COLUMNS
+        if self._display is None:
+            table = self._read(ALL_COLUMNS)
+            self._display = (table, {course_id: row for row, course_id in enumerate(table.column('id').to_pylist())})
+        table, rows_by_id = self._display
+        course_ids = list(course_ids)
+        selected = table.take([rows_by_id[course_id] for course_id in course_ids]).select(columns)
+        frame = self._to_frame(selected)
+        frame.index = pd.Index(course_ids, name='id')
+        return frame
+
+
+def open_catalog_store(location='memory'):
+    """Catalog store for a location: 'memory', a SQLite file, or a Parquet/Arrow file"""
+    if location == 'memory':
+        return InMemoryCatalogStore()
+    extension = os.path.splitext(location)[1].lower()
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        return SQLiteCatalogStore(location)
+    if extension in ('.parquet', '.arrow', '.feather'):
+        return ArrowCatalogStore(location)
+    raise ValueError(f"Unsupported catalog location: {location}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Export the in-code catalog, e.g. `python catalog_store.py catalog.db`
+    target = open_catalog_store(sys.argv[1])
+    target.write(InMemoryCatalogStore().load())
+    print(f"✅ Wrote {len(target.load(['id']))} courses to {sys.argv[1]}")
@@ -1,7 +1,8 @@
 # course_data.py - Course Database (25+ courses as required)
 import pandas as pd
 
-def get_course_catalog():
+def get_course_records():
+    """Raw course dicts backing the in-code catalog"""
     courses = [
         # Programming & Development
         {
@@ -191,7 +192,10 @@ def get_course_catalog():
         }
     ]
     
-    return pd.DataFrame(courses)
+    return courses
+
+def get_course_catalog():
+    return pd.DataFrame(get_course_records())
 
 if __name__ == "__main__":
     catalog = get_course_catalog()
@@ -0,0 +1,151 @@
+# course_index.py - Inverted Skill/Domain Index for Candidate Generation
+import copy
+
+import numpy as np
+
+from scoring import LEVELS, LEVEL_TABLE, PREREQ_TIERS, MIN_MATCH_SCORE, select_top
+from instrumentation import count
+
+# Touched courses are scored exactly in blocks of at least this many rows
+SCORE_BLOCK = 256
+
+
+class CourseIndex:
+    """Postings from skills, prerequisites, domains and career paths to catalog rows
+
+    Only courses that share a skill, a prerequisite or the target domain with
+    the user ("touched" courses) can earn skill or domain points or lose fewer
+    prerequisite points. Every other course scores level + prerequisite tier,
+    which is fixed per (course level, prerequisite count) bucket, so those
+    buckets are kept pre-sorted and read only as far as the top-N needs.
+
+    Rows appended after the index was built (the "tail") are always treated
+    as touched, and tombstoned rows are skipped, until the catalog is compacted.
+    """
+
+    def __init__(self, scoring_engine):
+        self.engine = scoring_engine
+        self.n_indexed = scoring_engine.n_courses
+
+        # CSC columns are the posting lists: skill/prereq id -> sorted course rows
+        self.skill_postings = scoring_engine.skill_matrix.tocsc()
+        self.prereq_postings = scoring_engine.prereq_matrix.tocsc()
+        self.domain_postings = self._group(scoring_engine.domain_codes, len(scoring_engine.domain_values))
+        self.career_postings = self._group(scoring_engine.career_codes, len(scoring_engine.career_values))
+
+        # Buckets of untouched courses: (level code, prerequisite tier) -> sorted course rows
+        tiers = np.minimum(scoring_engine.prereq_counts, len(PREREQ_TIERS) - 1)
+        bucket_codes = scoring_engine.level_codes * len(PREREQ_TIERS) + tiers
+        n_buckets = LEVEL_TABLE.shape[1] * len(PREREQ_TIERS)
+        self.buckets = self._group(bucket_codes, n_buckets)
+        self.bucket_levels, self.bucket_tiers = np.divmod(np.arange(n_buckets), len(PREREQ_TIERS))
+
+    def extended(self, scoring_engine):
+        """Copy of the index serving an engine with appended or tombstoned rows"""
+        index = copy.copy(self)
+        index.engine = scoring_engine
+        return index
+
+    @staticmethod
+    def _group(codes, n_groups):
+        """Sorted row indices for each code value"""
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(n_groups + 1))
+        return [order[bounds[g]:bounds[g + 1]] for g in range(n_groups)]
+
+    @staticmethod
+    def _column_rows(postings, columns):
+        """Concatenated course rows of the given posting columns"""
+        columns = [c for c in columns if c < postings.shape[1]]  # Skills first seen in the tail
+        if not columns:
+            return np.empty(0, dtype=postings.indices.dtype)
+        return np.concatenate([postings.indices[postings.indptr[c]:postings.indptr[c + 1]] for c in columns])
+
+    def _domain_rows(self, target_domain):
+        """Course rows whose domain or career path contains the target domain"""
+        if not target_domain:
+            return np.empty(0, dtype=np.intp)
+        rows = [self.domain_postings[code] for code, value in enumerate(self.engine.domain_values)
+                if target_domain in value]
+        rows += [self.career_postings[code] for code, value in enumerate(self.engine.career_values)
+                 if target_domain in value]
+        return np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+
+    def candidates(self, profile):
+        """Touched course rows (sorted) and an upper bound on each one's match score
+
+        The bound is exact for skills, level and domain and assumes every
+        prerequisite is satisfied.
+        """
+        skill_ids = self.engine._skill_ids(profile)
+        skill_rows, skill_matches = np.unique(self._column_rows(self.skill_postings, skill_ids),
+                                              return_counts=True)
+        prereq_rows = self._column_rows(self.prereq_postings, skill_ids)
+        target_domain = profile.target_domain
+        tail_rows = np.arange(self.n_indexed, self.engine.n_courses)
+        touched = np.union1d(np.union1d(skill_rows, prereq_rows), self._domain_rows(target_domain))
+        touched = np.setdiff1d(np.union1d(touched, tail_rows), self.engine.removed, assume_unique=True)
+
+        matches = np.zeros(len(touched))
+        hits = np.isin(skill_rows, touched, assume_unique=True)
+        matches[np.searchsorted(touched, skill_rows[hits])] = skill_matches[hits]
+        upper = matches / self.engine.skill_counts[touched] * 40
+        upper += LEVEL_TABLE[LEVELS.index(profile.level)][self.engine.level_codes[touched]]
+        upper += PREREQ_TIERS[0]
+        upper += np.where(self.engine._domain_hits(target_domain, touched), 15, 0)
+        upper = np.minimum(100, upper.astype(np.int64))
+        upper[touched >= self.n_indexed] = 100  # No postings for the tail yet
+        return touched, upper
+
+    def top(self, profile, top_n):
+        """Ranked (course rows, scores) for a UserProfile, identical to select_top over the full catalog"""
+        if top_n <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+        touched, upper = self.candidates(profile)
+        rows, scores = self._untouched_top(np.union1d(touched, self.engine.removed), profile.level, top_n)
+        count('candidates_touched', len(touched))
+
+        # Threshold algorithm: score touched courses by descending bound until none can enter
+        order = np.lexsort((touched, -upper))
+        block = max(SCORE_BLOCK, top_n)
+        for start in range(0, len(order), block):
+            if upper[order[start]] < self._threshold(scores, top_n):
+                break
+            block_rows = touched[order[start:start + block]]
+            count('candidates_scored', len(block_rows))
+            rows = np.concatenate([rows, block_rows])
+            scores = np.concatenate([scores, self.engine.score(profile, block_rows)])
+
+        by_row = np.argsort(rows)
+        rows, scores = rows[by_row], scores[by_row]
+        best = select_top(scores, top_n)[0]
+        return rows[best], scores[best]
+
+    def _untouched_top(self, excluded, user_level, top_n):
+        """Best courses outside excluded (sorted rows), read from the buckets by descending score"""
+        bucket_scores = (LEVEL_TABLE[LEVELS.index(user_level)][self.bucket_levels]
+                         + PREREQ_TIERS[self.bucket_tiers]).astype(np.int64)
+        rows, scores = [], []
+        found = 0
+        for bucket in np.argsort(-bucket_scores, kind='stable'):
+            score = bucket_scores[bucket]
+            if score < MIN_MATCH_SCORE or (found >= top_n and score < scores[-1][0]):
+                break
+            # A prefix of top_n + |excluded| rows always holds top_n untouched ones
+            prefix = self.buckets[bucket][:top_n + len(excluded)]
+            prefix = prefix[~np.isin(prefix, excluded, assume_unique=True)][:top_n]
+            if len(prefix):
+                rows.append(prefix)
+                scores.append(np.full(len(prefix), score, dtype=np.int64))
+                found += len(prefix)
+        if not rows:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    @staticmethod
+    def _threshold(scores, top_n):
+        """Lowest score a course still needs to reach the current top_n"""
+        qualifying = scores[scores >= MIN_MATCH_SCORE]
+        if len(qualifying) < top_n:
+            return MIN_MATCH_SCORE
+        return np.partition(qualifying, len(qualifying) - top_n)[len(qualifying) - top_n]
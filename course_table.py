@@ -0,0 +1,232 @@
+# course_table.py - Columnar Course Metadata for Result Materialization
+import sys
+
+import numpy as np
+import pandas as pd
+
+from buffers import ArrayBuffer
+from catalog_store import LIST_COLUMNS
+
+TEXT_UNIQUE_RATIO = 0.5  # String columns at least this unique are stored as UTF-8 bytes, the rest as codes
+
+
+class _Missing:
+    """Marks a field a row does not have (e.g. a column only later updates brought in)"""
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+class _Interner:
+    """Append-only value dictionary; codes handed out are never reassigned"""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._lookup = None  # Rebuilt on demand, e.g. after unpickling
+
+    def __getstate__(self):
+        return {'values': self.values}
+
+    def __setstate__(self, state):
+        self.__init__(state['values'])
+
+    def encode(self, items):
+        lookup = self._lookup
+        if lookup is None:
+            lookup = self._lookup = {}
+            for code, value in enumerate(self.values):
+                try:
+                    lookup.setdefault(value, code)
+                except TypeError:
+                    pass
+        codes = []
+        for item in items:
+            try:
+                code = lookup.get(item)
+            except TypeError:  # Unhashable values are stored once per occurrence
+                code = None
+            if code is None:
+                code = len(self.values)
+                self.values.append(item)
+                try:
+                    lookup[item] = code
+                except TypeError:
+                    pass
+            codes.append(code)
+        return codes
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(value) for value in self.values)
+
+
+class _CodedColumn:
+    """Scalar column as int32 codes into interned values"""
+
+    def __init__(self, interner, codes):
+        self.interner = interner
+        self.codes = codes
+
+    @classmethod
+    def build(cls, values):
+        interner = _Interner()
+        return cls(interner, ArrayBuffer(interner.encode(values), np.int32))
+
+    def extended(self, size, values):
+        return _CodedColumn(self.interner, self.codes.extend(size, self.interner.encode(values)))
+
+    def take(self, rows):
+        values = self.interner.values
+        return [values[code] for code in self.codes.data[rows].tolist()]
+
+    def nbytes(self):
+        return self.codes.view().nbytes + self.interner.nbytes()
+
+
+class _TextColumn:
+    """Mostly-unique string column as one UTF-8 buffer plus offsets"""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def _encode(values):
+        encoded = [value.encode('utf-8') for value in values]
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8), np.cumsum([len(e) for e in encoded], dtype=np.int64)
+
+    @classmethod
+    def build(cls, values):
+        blob, ends = cls._encode(values)
+        return cls(ArrayBuffer(blob), ArrayBuffer(np.concatenate([[0], ends]).astype(np.int64)))
+
+    def extended(self, size, values):
+        blob, ends = self._encode(values)
+        start = int(self.offsets.data[size])
+        return _TextColumn(self.blob.extend(start, blob), self.offsets.extend(size + 1, ends + start))
+
+    def take(self, rows):
+        offsets, blob = self.offsets.data, self.blob.data
+        return [blob[start:stop].tobytes().decode('utf-8')
+                for start, stop in zip(offsets[rows].tolist(), offsets[np.asarray(rows) + 1].tolist())]
+
+    def nbytes(self):
+        return int(self.offsets.view()[-1]) + self.offsets.view().nbytes
+
+
+class _ListColumn:
+    """Column of string lists as offsets plus int32 codes into a dictionary shared by the table"""
+
+    def __init__(self, interner, offsets, codes):
+        self.interner = interner
+        self.offsets = offsets
+        self.codes = codes
+
+    @staticmethod
+    def _encode(interner, lists):
+        lists = [[] if items is MISSING else list(items) for items in lists]
+        ends = np.cumsum([len(items) for items in lists], dtype=np.int64)
+        return ends, interner.encode(item for items in lists for item in items)
+
+    @classmethod
+    def build(cls, interner, lists):
+        ends, codes = cls._encode(interner, lists)
+        return cls(interner, ArrayBuffer(np.concatenate([[0], ends]).astype(np.int64)), ArrayBuffer(codes, np.int32))
+
+    def extended(self, size, lists):
+        ends, codes = self._encode(self.interner, lists)
+        start = int(self.offsets.data[size])
+        return _ListColumn(self.interner, self.offsets.extend(size + 1, ends + start),
+                           self.codes.extend(start, codes))
+
+    def take(self, rows):
+        # memoryview slicing beats numpy's per-call overhead for the handful of rows materialized
+        values, offsets, codes = self.interner.values, memoryview(self.offsets.data), memoryview(self.codes.data)
+        return [[values[code] for code in codes[offsets[row]:offsets[row + 1]].tolist()]
+                for row in np.asarray(rows).tolist()]
+
+    def nbytes(self):
+        return self.offsets.view().nbytes + int(self.offsets.view()[-1]) * 4
+
+
+def _is_list(value):
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+class CourseTable:
+    """Course metadata stored column by column, materialized by integer row
+
+    Scalar columns are interned codes (or UTF-8 bytes when mostly unique),
+    list columns are offsets into one shared string dictionary. Appending
+    returns a new table; older tables keep seeing only their own rows, like
+    the scoring engine's buffers.
+    """
+
+    def __init__(self, courses_df):
+        self.n_rows = len(courses_df)
+        self.names = list(courses_df.columns)
+        self.list_items = _Interner()
+        self.columns = {name: self._build_column(name, courses_df[name].tolist()) for name in self.names}
+        self.has_missing = False  # Set once appends leave some row without a field
+
+    def _build_column(self, name, values):
+        if name in LIST_COLUMNS or (values and all(_is_list(value) or value is MISSING for value in values)):
+            return _ListColumn.build(self.list_items, values)
+        if values and all(type(value) is str for value in values) \
+                and len(set(values)) >= TEXT_UNIQUE_RATIO * len(values):
+            return _TextColumn.build(values)
+        return _CodedColumn.build(values)
+
+    def __len__(self):
+        return self.n_rows
+
+    def extended(self, courses_df):
+        """Table with ``courses_df`` appended (columns are matched by name; absent fields are MISSING)"""
+        table = object.__new__(CourseTable)
+        table.__dict__.update(self.__dict__)
+        table.n_rows = self.n_rows + len(courses_df)
+        table.names = self.names + [name for name in courses_df.columns if name not in self.names]
+        table.columns = {}
+        for name in table.names:
+            values = courses_df[name].tolist() if name in courses_df.columns else [MISSING] * len(courses_df)
+            column = self.columns.get(name)
+            table.has_missing = table.has_missing or column is None or name not in courses_df.columns
+            if column is None:  # A new column: earlier rows lack it
+                column = table._build_column(name, [MISSING] * self.n_rows + values)
+            elif isinstance(column, _TextColumn) and not all(type(value) is str for value in values):
+                column = _CodedColumn.build(column.take(np.arange(self.n_rows)) + values)
+            else:
+                column = column.extended(self.n_rows, values)
+            table.columns[name] = column
+        return table
+
+    def records(self, rows):
+        """One dict per row (fields the row lacks are left out), in the order of ``rows``"""
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = [self.columns[name].take(rows) for name in self.names]
+        records = [dict(zip(self.names, values)) for values in zip(*columns)]
+        for name, values in zip(self.names, columns if self.has_missing else ()):
+            if any(value is MISSING for value in values):
+                for record in records:
+                    if record[name] is MISSING:
+                        del record[name]
+        return records
+
+    def to_frame(self, rows=None):
+        """DataFrame of the given rows (default: all), with NaN for missing fields"""
+        rows = np.arange(self.n_rows) if rows is None else np.asarray(rows, dtype=np.intp)
+        data = {name: [np.nan if value is MISSING else value for value in self.columns[name].take(rows)]
+                for name in self.names}
+        return pd.DataFrame(data, columns=self.names)
+
+    def nbytes(self):
+        """Approximate memory held by the columns (shared dictionaries counted once)"""
+        total = self.list_items.nbytes()
+        for column in self.columns.values():
+            total += column.nbytes()
+        return total
@@ -0,0 +1,314 @@
+# instrumentation.py - Stage Timings, Counters, Metric Sinks & Sampling Profiler
+import contextvars
+import functools
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_sinks = []  # Receive every stage and counter while instrumentation is enabled
+_current = contextvars.ContextVar('smartcareer_trace', default=None)
+
+
+class _NullStage:
+    """Shared no-op stage returned while nothing is being recorded"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Trace:
+    """Stages and counters recorded for one call (a request, a batch, a page render)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = None
+        self.stages = []  # (stage name, seconds), in completion order
+        self.counters = Counter()
+        self.profile = None  # SamplingProfiler, when the trace was profiled
+
+    def breakdown(self):
+        """Per-stage calls, total milliseconds and share of the whole trace"""
+        totals, calls = {}, Counter()
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+            calls[name] += 1
+        whole = self.seconds or sum(totals.values()) or 1.0
+        return [{'stage': name, 'calls': calls[name], 'ms': seconds * 1000, 'share': seconds / whole}
+                for name, seconds in totals.items()]
+
+    def as_dict(self):
+        return {
+            'trace': self.name,
+            'ms': self.seconds * 1000 if self.seconds is not None else None,
+            'stages': {row['stage']: round(row['ms'], 3) for row in self.breakdown()},
+            'counters': dict(self.counters)
+        }
+
+
+class _Stage:
+    __slots__ = ('name', 'trace', 'started')
+
+    def __init__(self, name, trace):
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        if self.trace is not None:
+            self.trace.stages.append((self.name, seconds))
+        for sink in _sinks:
+            sink.observe(self.name, seconds)
+        return False
+
+
+def enable(*sinks):
+    """Start feeding stages and counters to ``sinks`` (replacing any previous ones)"""
+    _sinks[:] = sinks
+
+
+def disable():
+    _sinks.clear()
+
+
+def is_enabled():
+    return bool(_sinks)
+
+
+def current_trace():
+    return _current.get()
+
+
+def stage(name):
+    """Context manager timing one pipeline stage (a no-op unless enabled or inside a trace)"""
+    trace = _current.get()
+    if trace is None and not _sinks:
+        return _NULL_STAGE
+    return _Stage(name, trace)
+
+
+def count(name, value=1):
+    """Add to a counter (candidates scored, cache hits, ...) of the current trace and the sinks"""
+    trace = _current.get()
+    if trace is not None:
+        trace.counters[name] += value
+    for sink in _sinks:
+        sink.increment(name, value)
+
+
+def absorb(other):
+    """Copy another Trace's stages and counters into the current trace (e.g. a shared batch's)"""
+    trace = _current.get()
+    if trace is not None and other is not None:
+        trace.stages.extend(other.stages)
+        trace.counters.update(other.counters)
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _sinks and _current.get() is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(name, profile=False, interval=None):
+    """Collect every stage and counter recorded by this thread/task into a Trace
+
+    Tracing works even while instrumentation is disabled, so a single request
+    can be inspected (e.g. from the app's debug panel). With ``profile`` a
+    SamplingProfiler samples this thread's stack for the duration.
+    """
+    current = Trace(name)
+    token = _current.set(current)
+    profiler = SamplingProfiler(interval or SamplingProfiler.INTERVAL).start() if profile else None
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - started
+        if profiler is not None:
+            current.profile = profiler.stop()
+        _current.reset(token)
+        for sink in _sinks:
+            sink.observe(name, current.seconds)
+            sink.finish(current)
+
+
+class Sink:
+    """Receives measurements; override the hooks a sink cares about"""
+
+    def observe(self, stage_name, seconds):
+        pass
+
+    def increment(self, name, value):
+        pass
+
+    def finish(self, trace):
+        pass
+
+
+class HistogramSink(Sink):
+    """In-memory latency histograms per stage and totals per counter"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.histograms = {}  # stage -> [bucket counts..., +Inf count, sum of seconds]
+        self.counters = Counter()
+
+    def observe(self, stage_name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage_name)
+            if histogram is None:
+                histogram = self.histograms[stage_name] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+    def increment(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        """{stage: {'count', 'sum', 'buckets': [(le, cumulative count)]}} and counter totals"""
+        with self._lock:
+            stages = {}
+            for stage_name, histogram in self.histograms.items():
+                cumulative, rows = 0, []
+                for bound, n in zip(self.buckets + (float('inf'),), histogram[:-1]):
+                    cumulative += n
+                    rows.append((bound, cumulative))
+                stages[stage_name] = {'count': cumulative, 'sum': histogram[-1], 'buckets': rows}
+            return {'stages': stages, 'counters': dict(self.counters)}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+class LogSink(Sink):
+    """One structured (JSON) log line per finished trace"""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('smartcareer.instrumentation')
+        self.level = level
+
+    def finish(self, trace):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, json.dumps(trace.as_dict()))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(sink, prefix='smartcareer'):
+    """Prometheus text exposition (format 0.0.4) of a HistogramSink"""
+    snapshot = sink.snapshot()
+    lines = [f"# HELP {prefix}_stage_seconds Time spent per pipeline stage",
+             f"# TYPE {prefix}_stage_seconds histogram"]
+    for stage_name, histogram in sorted(snapshot['stages'].items()):
+        label = f'stage="{_label(stage_name)}"'
+        for bound, cumulative in histogram['buckets']:
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+        lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {histogram['sum']!r}")
+        lines.append(f"{prefix}_stage_seconds_count{{{label}}} {histogram['count']}")
+    lines += [f"# HELP {prefix}_events_total Pipeline counters (candidates, cache hits, ...)",
+              f"# TYPE {prefix}_events_total counter"]
+    for name, value in sorted(snapshot['counters'].items()):
+        lines.append(f'{prefix}_events_total{{name="{_label(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a background thread
+
+    Opt-in only: it costs a thread and a stack walk per sample. Results are
+    available as the hottest functions or as collapsed stacks for flame graphs.
+    """
+
+    INTERVAL = 0.002
+
+    def __init__(self, interval=INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples = Counter()  # stack (outermost first) -> count
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        return f"{module}.{code.co_name}"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def top(self, n=10):
+        """[(function, share of samples with it on the stack)] for the n most frequent functions"""
+        total = sum(self.samples.values())
+        inclusive = Counter()
+        for stack, hits in self.samples.items():
+            for name in set(stack):
+                inclusive[name] += hits
+        return [(name, hits / total) for name, hits in inclusive.most_common(n)] if total else []
+
+    def collapsed(self):
+        """Collapsed stacks ("a;b;c count" per line), the input format of flamegraph tools"""
+        return '\n'.join(f"{';'.join(stack)} {hits}" for stack, hits in self.samples.most_common())
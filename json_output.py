@@ -0,0 +1,183 @@
+# json_output.py - Pre-Encoded JSON Fragments for generate_json_output Responses
+import json
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Optional faster encoder
+    orjson = None
+
+
+def json_default(value):
+    """Plain Python values for numpy scalars left in recommendation records"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode(value):
+    """One JSON value exactly as json.dumps writes it (ASCII-escaped)"""
+    if type(value) is str:
+        return encode_basestring_ascii(value).encode('ascii')
+    if type(value) is int:
+        return str(value).encode('ascii')
+    return json.dumps(value, default=json_default).encode('ascii')
+
+
+_TIMELINES = {when: _encode(when) for when in ('short-term', 'medium-term', 'long-term')}
+
+
+def _reason(career_path):
+    return f"Builds on current skills and leads to {career_path} role"
+
+
+class _Style:
+    """Separators and indentation of one json.dumps configuration"""
+
+    def __init__(self, indent=None, compact=False):
+        self.key = b':' if compact else b': '
+        self.item = b',' if compact or indent is not None else b', '
+        self.indent = indent
+        self._fields = {}
+
+    def newline(self, depth):
+        if self.indent is None:
+            return b''
+        return b'\n' + b' ' * (self.indent * depth)
+
+    def separator(self, depth):
+        return self.item + self.newline(depth)
+
+    def field(self, depth, name, first=False):
+        """Separator (or opening newline) and key of one object field at depth"""
+        field = self._fields.get((depth, name, first))
+        if field is None:
+            field = (self.newline(depth) if first else self.separator(depth)) + b'"' + name + b'"' + self.key
+            self._fields[(depth, name, first)] = field
+        return field
+
+    def array(self, depth, items):
+        """Array whose elements sit at depth + 1"""
+        if not items:
+            return b'[]'
+        return b'[' + self.newline(depth + 1) + self.separator(depth + 1).join(items) + self.newline(depth) + b']'
+
+
+_styles = {}
+
+
+def _style(indent, compact):
+    style = _styles.get((indent, compact))
+    if style is None:
+        style = _styles[(indent, compact)] = _Style(indent, compact)
+    return style
+
+
+class _CourseFragments:
+    """Course-static bytes of one course in each style: recommendation head/tail and timeline entry"""
+
+    __slots__ = ('title', 'provider', 'career_path', '_parts')
+
+    def __init__(self, title, provider, career_path):
+        self.title, self.provider, self.career_path = title, provider, career_path
+        self._parts = {}
+
+    def matches(self, record):
+        return (record['title'] == self.title and record['provider'] == self.provider
+                and record['career_path'] == self.career_path)
+
+    def timeline_matches(self, record):
+        return record['title'] == self.title and record['career_path'] == self.career_path
+
+    def parts(self, style):
+        parts = self._parts.get(style)
+        if parts is None:
+            title, career_path = _encode(self.title), _encode(self.career_path)
+            head = (b'{' + style.field(3, b'course_title', first=True) + title
+                    + style.field(3, b'provider') + _encode(self.provider) + style.field(3, b'match_score'))
+            tail = style.field(3, b'career_path') + career_path + style.newline(2) + b'}'
+            entry = (b'{' + style.field(4, b'course_title', first=True) + title
+                     + style.field(4, b'reason') + _encode(_reason(self.career_path)) + style.newline(3) + b'}')
+            parts = self._parts[style] = (head, tail, entry)
+        return parts
+
+
+class FragmentTable:
+    """Pre-encoded course fragments by course id, filled on first use
+
+    A catalog state owns one table. Entries are checked against the record's
+    title, provider and career path before use, so a course edited in a
+    later catalog version is simply re-encoded. Not persisted with models.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, record, timeline=False):
+        course_id = record.get('course_id')
+        entry = self._entries.get(course_id) if type(course_id) in (str, int) else None
+        if entry is not None and (entry.timeline_matches(record) if timeline else entry.matches(record)):
+            return entry
+        entry = _CourseFragments(record['title'], record['provider'] if not timeline else record.get('provider'),
+                                 record['career_path'])
+        if type(course_id) in (str, int) and not timeline:
+            self._entries[course_id] = entry
+        return entry
+
+
+def render_json_output(recommendations, learning_path, indent=None, compact=False, fragments=None):
+    """Bytes of json.dumps(generate_json_output(recommendations, learning_path), indent=indent)
+
+    Byte-identical to json.dumps with the same indent (``compact`` switches
+    to ',' and ':' separators, like separators=(',', ':')). Course-static
+    parts come from ``fragments`` (a FragmentTable, e.g. the recommender's
+    json_fragments); only score, justification and timeline are encoded
+    per call.
+    """
+    style = _style(indent, compact)
+    fragments = fragments if fragments is not None else FragmentTable()
+    justification, timeline = style.field(3, b'justification'), style.field(3, b'timeline')
+
+    items = []
+    for rec in recommendations:
+        head, tail, _ = fragments.lookup(rec).parts(style)
+        score, text, when = rec['match_score'], rec['justification'], rec['timeline']
+        items.append(b''.join((
+            head, str(score).encode('ascii') if type(score) is int else _encode(score),
+            justification, encode_basestring_ascii(text).encode('ascii') if type(text) is str else _encode(text),
+            timeline, _TIMELINES.get(when) or _encode(when), tail
+        )))
+
+    plans = []
+    for i, name in enumerate((b'short_term', b'medium_term', b'long_term')):
+        entries = [fragments.lookup(course, timeline=True).parts(style)[2]
+                   for course in learning_path[f"{name.decode()}_plan"]]
+        plans.append(style.field(2, name, first=i == 0) + style.array(2, entries))
+
+    return (b'{' + style.field(1, b'user_recommendations', first=True) + style.array(1, items)
+            + style.field(1, b'learning_timeline') + b'{' + b''.join(plans) + style.newline(1) + b'}'
+            + style.newline(0) + b'}')
+
+
+def encode_payload(payload, encoder='json'):
+    """Response bytes for any JSON payload: 'json' (stdlib, ASCII) or 'orjson' (UTF-8, compact)
+
+    orjson output holds the same JSON values but is not byte-identical to
+    json.dumps: separators are compact and non-ASCII text is not escaped.
+    """
+    if encoder == 'orjson':
+        if orjson is None:
+            raise ImportError("The orjson encoder needs orjson: pip install orjson")
+        return orjson.dumps(payload, default=json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=json_default).encode('utf-8')
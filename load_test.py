@@ -0,0 +1,456 @@
+# load_test.py - Concurrent Load Test of the Recommendation Service (scaling report)
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark import environment
+from catalog_store import SCORING_COLUMNS, open_catalog_store
+from recommender import CareerRecommender
+from result_cache import RESULT_CACHE_SIZE
+from sample_profiles import get_sample_profiles
+from service import RecommendationService
+from synthetic_data import generate_catalog, generate_profiles
+
+LATENCY_PERCENTILES = (50, 95, 99)
+RSS_SAMPLE_SECONDS = 0.1
+STARTUP_TIMEOUT = 300  # Seconds a spawned service may take to load or fit its model
+FLAT_GAIN = 1.1  # More workers that add less than 10% throughput stop scaling
+GIL_CORES = (0.8, 1.5)  # ... and while the process keeps about one core busy, the GIL is the limit
+RSS_GROWTH = 0.25  # Peak RSS this much above the first step's is reported as memory growth
+MEMORY_SATURATION = 0.8  # Share of physical memory at which RSS counts as saturated
+OFFERED_MET = 0.95  # Open-loop steps reaching this share of the offered QPS kept up with it
+
+
+def replay_profiles(n_profiles, seed=1, n_courses=None):
+    """Distinct request profiles shaped like sample_profiles.get_sample_profiles()
+
+    For a synthetic catalog of ``n_courses`` these are
+    synthetic_data.generate_profiles; for the served catalog each is a variant
+    of a sample profile: a subset of its skills plus up to two skills of the
+    others, a shifted experience and now and then another target domain.
+    """
+    if n_courses:
+        return generate_profiles(n_profiles, seed=seed, n_courses=n_courses)
+    rng = np.random.default_rng(seed)
+    samples = get_sample_profiles()
+    all_skills = sorted({s for sample in samples for s in sample['technical_skills']})
+    domains = [sample['target_domain'] for sample in samples]
+    profiles = []
+    for i in range(n_profiles):
+        base = samples[i % len(samples)]
+        own = base['technical_skills']
+        skills = rng.choice(own, rng.integers(1, len(own) + 1), replace=False).tolist()
+        skills += [s for s in rng.choice(all_skills, rng.integers(0, 3), replace=False).tolist() if s not in skills]
+        profiles.append(dict(
+            base,
+            name=f"{base['name']} #{i + 1}",
+            technical_skills=skills,
+            target_domain=domains[rng.integers(len(domains))] if rng.random() < 0.1 else base['target_domain'],
+            experience_years=max(0, base['experience_years'] + int(rng.integers(-1, 3)))
+        ))
+    return profiles
+
+
+def physical_memory():
+    """Bytes of physical memory, None where sysconf does not report it"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def process_usage(pid=None):
+    """(CPU seconds, resident bytes) of a process, from /proc on Linux
+
+    Elsewhere only this process is measured, with its peak instead of
+    current RSS; another process's usage is (None, None).
+    """
+    pid = pid or os.getpid()
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()  # The command name may contain spaces
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK'), pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if pid != os.getpid():
+            return None, None
+        times = os.times()
+        try:
+            import resource
+        except ImportError:  # Not available on Windows
+            return times.user + times.system, None
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux, bytes on macOS
+        return times.user + times.system, max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client for the local service, one request in flight"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b''):
+        """(status, response body bytes)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class InProcessTarget:
+    """RecommendationService called directly in this process (shares the GIL with the load generator)"""
+
+    def __init__(self, recommender, workers):
+        self.service = RecommendationService(recommender, workers=workers)
+        self.pid = os.getpid()
+
+    async def start(self):
+        pass
+
+    async def send(self, slot, path, body):
+        return (await self.service.dispatch('POST', path, body))[0]
+
+    async def stats(self):
+        return json.loads((await self.service.dispatch('GET', '/stats'))[1])
+
+    async def close(self):
+        await self.service.close()
+
+
+class LocalhostTarget:
+    """service.py over HTTP on localhost: spawned with ``workers`` scoring threads, or already running at url"""
+
+    def __init__(self, workers=None, url=None, catalog=None, pid=None):
+        self.workers, self.catalog = workers, catalog
+        self.process = None
+        self.pid = pid  # Of a running service, to measure its CPU and RSS
+        if url:
+            host, _, port = url.split('://')[-1].rstrip('/').rpartition(':')
+            self.host, self.port = host, int(port)
+        else:
+            self.host, self.port = '127.0.0.1', None
+        self.connections = {}
+
+    async def start(self):
+        if self.port is not None:
+            return
+        with socket.socket() as probe:
+            probe.bind((self.host, 0))
+            self.port = probe.getsockname()[1]
+        env = dict(os.environ)
+        if self.catalog:
+            env['SMARTCAREER_CATALOG'] = self.catalog
+        self.process = subprocess.Popen(
+            [sys.executable, 'service.py', '--host', self.host, '--port', str(self.port),
+             '--workers', str(self.workers)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=subprocess.DEVNULL
+        )
+        self.pid = self.process.pid
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                probe = HttpConnection(self.host, self.port)
+                status, _ = await probe.request('GET', '/health')
+                probe.close()
+                if status == 200:
+                    return
+            except (OSError, IndexError, ValueError, asyncio.IncompleteReadError):
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"service on port {self.port} did not start")
+            await asyncio.sleep(0.2)
+
+    async def send(self, slot, path, body):
+        connection = self.connections.get(slot)
+        if connection is None:
+            connection = self.connections[slot] = HttpConnection(self.host, self.port)
+        return (await connection.request('POST', path, body))[0]
+
+    async def stats(self):
+        connection = HttpConnection(self.host, self.port)
+        try:
+            return json.loads((await connection.request('GET', '/stats'))[1])
+        finally:
+            connection.close()
+
+    async def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+
+async def run_step(target, path, bodies, concurrency, duration, qps=None, first=0):
+    """(latencies in seconds, failed requests, wall seconds) of one load step
+
+    Request i sends ``bodies[(first + i) % len(bodies)]``, so consecutive
+    steps continue through the profiles instead of replaying cached ones.
+
+    Open loop when ``qps`` is given: request i is due at i / qps and its
+    latency counts from then, so requests waiting for a free slot show up as
+    latency instead of silently lowering the offered load. Closed loop
+    otherwise: each of ``concurrency`` users sends its next request as soon
+    as the last one returns, for ``duration`` seconds.
+    """
+    latencies, failed = [], 0
+    n_requests = int(qps * duration) if qps else None
+    sequence = itertools.count()
+    started = time.perf_counter()
+
+    async def user(slot):
+        nonlocal failed
+        while True:
+            i = next(sequence)
+            if qps:
+                if i >= n_requests:
+                    return
+                due = started + i / qps
+                if due > time.perf_counter():
+                    await asyncio.sleep(due - time.perf_counter())
+            else:
+                due = time.perf_counter()
+                if due - started >= duration:
+                    return
+            try:
+                status = await target.send(slot, path, bodies[(first + i) % len(bodies)])
+            except (OSError, asyncio.IncompleteReadError):
+                status = None
+            latencies.append(time.perf_counter() - due)
+            if status != 200:
+                failed += 1
+
+    await asyncio.gather(*(user(slot) for slot in range(concurrency)))
+    return latencies, failed, time.perf_counter() - started
+
+
+async def measure_step(target, path, bodies, workers, concurrency, duration, qps=None, first=0):
+    """Latency percentiles, throughput, CPU cores used and peak RSS of the target during one step"""
+    usage = (lambda: process_usage(target.pid)) if target.pid else (lambda: (None, None))
+    peak_rss = 0
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, usage()[1] or 0)
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    cache_before = (await target.stats())['result_cache']
+    cpu_before = usage()[0]
+    sampler = asyncio.ensure_future(sample_rss())
+    try:
+        latencies, failed, wall = await run_step(target, path, bodies, concurrency, duration, qps, first)
+    finally:
+        sampler.cancel()
+    cpu_after, rss = usage()
+    cache_after = (await target.stats())['result_cache']
+
+    latencies = np.asarray(latencies)
+    step = {
+        'workers': workers,
+        'concurrency': concurrency,
+        'target_qps': qps,
+        'requests': len(latencies),
+        'failed': failed,
+        'wall_seconds': wall,
+        'throughput_per_second': len(latencies) / wall,
+        'mean_ms': float(latencies.mean() * 1000),
+        'cpu_cores': (cpu_after - cpu_before) / wall if cpu_before is not None else None,
+        'peak_rss_bytes': max(peak_rss, rss or 0) or None,
+        'cache_hits': cache_after.get('hits', 0) - cache_before.get('hits', 0)
+    }
+    for p in LATENCY_PERCENTILES:
+        step[f"p{p}_ms"] = float(np.percentile(latencies, p) * 1000)
+    return step
+
+
+def scaling_report(steps, slo_ms, n_cpus=None, memory_bytes=None):
+    """Per worker count: best throughput, capacity within the p99 SLO and scaling; plus findings
+
+    When a worker count could not serve the offered load (or any closed-loop
+    load), more workers that add under 10% throughput are attributed to the
+    CPU when the process uses most cores, to the GIL when it keeps about one
+    core busy (GIL_CORES), and to the service's queueing otherwise.
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    by_workers = {}
+    for step in steps:
+        by_workers.setdefault(step['workers'], []).append(step)
+
+    scaling, findings = [], []
+    first_rss = steps[0]['peak_rss_bytes'] if steps else None
+    previous = None
+    for workers in sorted(by_workers):
+        group = by_workers[workers]
+        best = max(group, key=lambda s: s['throughput_per_second'])
+        within = [s for s in group if s['p99_ms'] <= slo_ms and not s['failed']]
+        capacity = max(within, key=lambda s: s['throughput_per_second']) if within else None
+        row = {
+            'workers': workers,
+            'best_throughput_per_second': best['throughput_per_second'],
+            'best_concurrency': best['concurrency'],
+            'cpu_cores': best['cpu_cores'],
+            'peak_rss_bytes': max((s['peak_rss_bytes'] or 0) for s in group) or None,
+            'max_concurrency_within_slo': capacity['concurrency'] if capacity else None,
+            'throughput_within_slo': capacity['throughput_per_second'] if capacity else None,
+            'met_offered_load': (bool(best['target_qps'])
+                                 and best['throughput_per_second'] >= OFFERED_MET * best['target_qps']),
+            'speedup': best['throughput_per_second'] / scaling[0]['best_throughput_per_second'] if scaling else 1.0
+        }
+        if workers:
+            row['efficiency'] = row['speedup'] * (scaling[0]['workers'] if scaling else workers) / workers
+        scaling.append(row)
+
+        label = f"{workers} workers" if workers else "service"
+        if capacity is None:
+            findings.append(f"{label}: no step met the p99 SLO of {slo_ms:g} ms")
+        else:
+            findings.append(f"{label}: up to {capacity['concurrency']} concurrent users "
+                            f"({capacity['throughput_per_second']:.0f} req/s) within the p99 SLO of {slo_ms:g} ms")
+        if previous is not None and not previous['met_offered_load']:
+            gain = row['best_throughput_per_second'] / previous['best_throughput_per_second']
+            cores = row['cpu_cores']
+            if gain < FLAT_GAIN:
+                if cores is None:
+                    cause = "CPU not measured"
+                elif cores >= 0.8 * n_cpus:
+                    cause = f"CPU saturation: {cores:.1f} of {n_cpus} cores busy"
+                elif GIL_CORES[0] <= cores < GIL_CORES[1]:
+                    cause = f"GIL contention: {cores:.1f} of {n_cpus} cores busy"
+                else:
+                    cause = f"queueing or batching in the service: {cores:.1f} of {n_cpus} cores busy"
+                findings.append(f"{previous['workers']} -> {workers} workers: throughput x{gain:.2f}, "
+                                f"stops scaling ({cause})")
+        rss = row['peak_rss_bytes']
+        if rss and memory_bytes and rss >= MEMORY_SATURATION * memory_bytes:
+            findings.append(f"{label}: memory saturated, peak RSS {rss / 2 ** 20:.0f} MiB of "
+                            f"{memory_bytes / 2 ** 20:.0f} MiB")
+        elif rss and first_rss and rss > (1 + RSS_GROWTH) * first_rss:
+            findings.append(f"{label}: peak RSS grew to {rss / 2 ** 20:.0f} MiB "
+                            f"from {first_rss / 2 ** 20:.0f} MiB in the first step")
+        previous = row
+    return {'slo_ms': slo_ms, 'n_cpus': n_cpus, 'by_workers': scaling, 'findings': findings}
+
+
+def served_recommender(n_courses, seed=0, cache=False):
+    """Recommender of a synthetic catalog, or of SMARTCAREER_CATALOG when n_courses is 0"""
+    cache_size = RESULT_CACHE_SIZE if cache else 0
+    if n_courses:
+        return CareerRecommender(generate_catalog(n_courses, seed=seed), cache_size=cache_size)
+    catalog_store = open_catalog_store(os.environ.get('SMARTCAREER_CATALOG', 'memory'))
+    return CareerRecommender(catalog_store.load(SCORING_COLUMNS), catalog_store=catalog_store, cache_size=cache_size)
+
+
+async def load_test(worker_counts, concurrencies, duration=5.0, qps=None, mode='inprocess', url=None,
+                    n_courses=10000, n_profiles=5000, path='/recommendations', top_n=10, seed=0, cache=False,
+                    warmup=20, pid=None):
+    """Steps of every (worker count, concurrency) pair against one target kind"""
+    profiles = replay_profiles(n_profiles, seed=seed + 1, n_courses=n_courses)
+    bodies = [json.dumps({'profile': profile, 'top_n': top_n}).encode('utf-8') for profile in profiles]
+
+    recommender = catalog = None
+    catalog_dir = tempfile.TemporaryDirectory()
+    if mode == 'inprocess':
+        recommender = served_recommender(n_courses, seed, cache)
+    elif url is None and n_courses:
+        # The spawned services serve the same synthetic catalog from SQLite
+        catalog = os.path.join(catalog_dir.name, 'catalog.db')
+        open_catalog_store(catalog).write(generate_catalog(n_courses, seed=seed))
+
+    steps, sent = [], 0
+    try:
+        for workers in ([None] if url else worker_counts):
+            target = (InProcessTarget(recommender, workers) if mode == 'inprocess'
+                      else LocalhostTarget(workers, url, catalog, pid))
+            await target.start()
+            try:
+                for body in bodies[-warmup:]:  # Imports, lazy compilation and connection setup stay unmeasured
+                    await target.send(0, path, body)
+                for concurrency in concurrencies:
+                    step = await measure_step(target, path, bodies, workers, concurrency, duration, qps, sent)
+                    sent += step['requests']
+                    steps.append(step)
+                    print(f"   workers {workers or 'url':>4}  users {concurrency:>4}  "
+                          f"{step['throughput_per_second']:8.1f} req/s  p50 {step['p50_ms']:8.2f}  "
+                          f"p95 {step['p95_ms']:8.2f}  p99 {step['p99_ms']:8.2f} ms")
+            finally:
+                await target.close()
+    finally:
+        if recommender is not None:
+            recommender.close()
+        catalog_dir.cleanup()
+    return steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the recommendation service at rising concurrency")
+    parser.add_argument('--mode', choices=['inprocess', 'localhost'], default='inprocess',
+                        help="call the service in this process, or over HTTP on a spawned service.py per worker count")
+    parser.add_argument('--url', help="load an already running service instead (e.g. http://127.0.0.1:8000)")
+    parser.add_argument('--pid', type=int, help="process id of the --url service, to measure its CPU and RSS")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help="scoring threads to compare")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help="concurrent users per step")
+    parser.add_argument('--qps', type=float, default=None,
+                        help="fixed offered load per step (open loop); default: each user sends back to back")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per step")
+    parser.add_argument('--courses', type=int, default=10000, help="synthetic catalog size (0: SMARTCAREER_CATALOG)")
+    parser.add_argument('--profiles', type=int, default=5000, help="distinct profiles replayed")
+    parser.add_argument('--path', default='/recommendations', choices=['/recommendations', '/json-output',
+                                                                      '/learning-path'])
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--slo-ms', type=float, default=200.0, help="p99 latency objective")
+    parser.add_argument('--cache', action='store_true', help="keep the result cache on (in-process only)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load_report.json')
+    args = parser.parse_args()
+    if args.url:
+        args.mode = 'localhost'
+
+    print(f"🚦 Load test ({args.mode}, {args.courses or 'served'} courses, "
+          f"{f'{args.qps:g} req/s offered' if args.qps else 'closed loop'})")
+    steps = asyncio.run(load_test(args.workers, args.concurrency, args.duration, args.qps, args.mode, args.url,
+                                  args.courses, args.profiles, args.path, args.top_n, args.seed, args.cache,
+                                  pid=args.pid))
+    report = scaling_report(steps, args.slo_ms, memory_bytes=physical_memory())
+    results = {'environment': environment(), 'settings': vars(args), 'steps': steps, 'scaling': report}
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"📈 Scaling (p99 SLO {args.slo_ms:g} ms)")
+    for row in report['by_workers']:
+        cores = f"{row['cpu_cores']:.2f}" if row['cpu_cores'] is not None else '-'
+        rss = f"{row['peak_rss_bytes'] / 2 ** 20:.0f}" if row['peak_rss_bytes'] else '-'
+        print(f"   workers {row['workers'] or 'url':>4}  best {row['best_throughput_per_second']:8.1f} req/s  "
+              f"x{row['speedup']:.2f}  cores {cores:>5}  RSS {rss:>6} MiB")
+    for finding in report['findings']:
+        print(f"   • {finding}")
+    print(f"✅ Wrote {args.output}")
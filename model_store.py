@@ -0,0 +1,173 @@
+# model_store.py - Cached & Persisted Recommender Models
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from recommender import CareerRecommender
+from instrumentation import stage
+from vector_index import VectorIndex, load_index, save_index
+
+# Bump whenever the pickled recommender layout changes so stale artifacts are rebuilt
+ARTIFACT_VERSION = 11
+
+CACHE_DIR = os.environ.get(
+    'SMARTCAREER_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'smartcareer')
+)
+
+_models = {}  # (catalog fingerprint, store location) -> fitted recommender, shared by every session
+_lock = threading.Lock()
+_stats = {
+    'memory_hits': 0,
+    'disk_hits': 0,
+    'misses': 0,
+    'last_load_seconds': None,
+    'last_build_seconds': None
+}
+
+
+def catalog_fingerprint(courses_df):
+    """Content hash of the course catalog (column order and row order included)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(courses_df.columns)).encode('utf-8'))
+    for record in courses_df.to_dict('records'):
+        digest.update(json.dumps(record, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def artifact_path(fingerprint, cache_dir=None):
+    """Location of the versioned artifact for a catalog fingerprint"""
+    return os.path.join(cache_dir or CACHE_DIR, f"recommender-v{ARTIFACT_VERSION}-{fingerprint[:32]}.pkl")
+
+
+def index_path(fingerprint, number, cache_dir=None):
+    """Location of an artifact's number-th vector index file (written by save_index)"""
+    return artifact_path(fingerprint, cache_dir)[:-len('.pkl')] + f"-{number}.index"
+
+
+def _write_atomically(path, write):
+    """Call write(tmp_path), then move the file into place so readers never see a partial one"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class _ArtifactPickler(pickle.Pickler):
+    """Pickles vector indexes as references to files of their own, written with save_index"""
+
+    def __init__(self, file, fingerprint, cache_dir=None):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.fingerprint, self.cache_dir = fingerprint, cache_dir
+        self.indexes = {}  # id(index) -> file name
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, VectorIndex):
+            return None
+        name = self.indexes.get(id(obj))
+        if name is None:
+            path = index_path(self.fingerprint, len(self.indexes), self.cache_dir)
+            _write_atomically(path, lambda tmp_path: save_index(obj, tmp_path))
+            name = self.indexes[id(obj)] = os.path.basename(path)
+        return ('vector_index', name)
+
+
+class _ArtifactUnpickler(pickle.Unpickler):
+    """Reopens the vector index files an _ArtifactPickler wrote, memory-mapped"""
+
+    def __init__(self, file, directory):
+        super().__init__(file)
+        self.directory = directory
+
+    def persistent_load(self, pid):
+        kind, name = pid
+        if kind != 'vector_index':
+            raise pickle.UnpicklingError(f"unknown persistent reference {kind!r}")
+        return load_index(os.path.join(self.directory, name), mmap=True)
+
+
+def save_recommender(recommender, fingerprint, cache_dir=None):
+    """Write the fitted recommender atomically so readers never see a partial file
+
+    Its vector index, if any, goes to a file of its own next to the pickle
+    and is memory-mapped again by load_recommender.
+    """
+    path = artifact_path(fingerprint, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    artifact = {'version': ARTIFACT_VERSION, 'fingerprint': fingerprint, 'recommender': recommender}
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            _ArtifactPickler(f, fingerprint, cache_dir).dump(artifact)
+
+    _write_atomically(path, write)
+    return path
+
+
+def load_recommender(fingerprint, cache_dir=None):
+    """Load a persisted recommender, or None if missing, stale or unreadable"""
+    path = artifact_path(fingerprint, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            artifact = _ArtifactUnpickler(f, os.path.dirname(path)).load()
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if artifact.get('version') != ARTIFACT_VERSION or artifact.get('fingerprint') != fingerprint:
+        return None
+    return artifact['recommender']
+
+
+def get_recommender(courses_df, cache_dir=None, catalog_store=None):
+    """Process-wide recommender for a catalog: memory cache, then disk artifact, then fit
+
+    ``catalog_store`` supplies display columns when ``courses_df`` is column-pruned;
+    it is attached after loading because artifacts are keyed by content only.
+    """
+    with stage('fingerprint_catalog'):
+        fingerprint = catalog_fingerprint(courses_df)
+    key = (fingerprint, getattr(catalog_store, 'location', None))
+    with _lock:
+        recommender = _models.get(key)
+        if recommender is not None:
+            _stats['memory_hits'] += 1
+            return recommender
+
+        started = time.perf_counter()
+        with stage('load_artifact'):
+            recommender = load_recommender(fingerprint, cache_dir)
+        if recommender is not None:
+            _stats['disk_hits'] += 1
+            _stats['last_load_seconds'] = time.perf_counter() - started
+        else:
+            _stats['misses'] += 1
+            with stage('build_recommender'):
+                recommender = CareerRecommender(courses_df, catalog_store=catalog_store)
+            _stats['last_build_seconds'] = time.perf_counter() - started
+            try:
+                save_recommender(recommender, fingerprint, cache_dir)
+            except OSError:
+                pass  # A read-only cache dir only costs the next cold start a refit
+
+        recommender.catalog_store = catalog_store
+        _models[key] = recommender
+        return recommender
+
+
+def cache_stats():
+    """Snapshot of cache hit/miss counters and the latest load/build times"""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_memory_cache():
+    """Drop process-wide models (persisted artifacts are kept)"""
+    with _lock:
+        _models.clear()
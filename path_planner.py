@@ -0,0 +1,306 @@
+# path_planner.py - Learning-Path Planning over the Prerequisite Graph
+import re
+
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+
+from scoring import LEVELS, select_top
+
+WEEKS_PER_MONTH = 52 / 12
+# Week budgets for the app's study duration choices; other strings are parsed
+STUDY_DURATION_WEEKS = {'1-3 months': 13, '3-6 months': 26, '6-12 months': 52, '12+ months': 104}
+DEFAULT_BUDGET_WEEKS = 52
+# Assumed length of a course whose duration is unknown (e.g. a column-pruned catalog)
+LEVEL_WEEKS = {'beginner': 4, 'intermediate': 6, 'advanced': 8}
+DEFAULT_COURSE_WEEKS = 6
+
+GOAL_CANDIDATES = 20  # Best-matching courses (in the target domain, else overall) the planner tries to reach
+GOAL_SCORE_SHARE = 0.75  # Courses scoring below this share of the best goal's score are not goals
+BEAM_WIDTH = 8
+MAX_STEPS = 8
+BRANCHING = 12  # Most prerequisite courses tried per beam state
+TEACHER_SCAN = 64  # Most teachers of one skill inspected per state (shortest first)
+
+# Plan bucket and timeline label by the week a step finishes (create_learning_path's keys)
+TIMELINE_WEEKS = (('short_term_plan', 'short-term', 13), ('medium_term_plan', 'medium-term', 26),
+                  ('long_term_plan', 'long-term', None))
+
+_UNITS = {'hour': 1 / 10, 'day': 1 / 7, 'week': 1, 'month': WEEKS_PER_MONTH, 'year': 52}
+
+
+def parse_weeks(text):
+    """Weeks in a duration like '6 weeks', '3 months' or '1-3 months' (upper bound); None if unparseable"""
+    if not isinstance(text, str):
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(?:-\s*(\d+(?:\.\d+)?))?\s*\+?\s*(hour|day|week|month|year)", text.lower())
+    if match is None:
+        return None
+    amount = float(match.group(2) or match.group(1))
+    return amount * _UNITS[match.group(3)]
+
+
+def study_budget_weeks(study_duration):
+    """Week budget for a profile's study_duration (None or unparseable: DEFAULT_BUDGET_WEEKS)"""
+    if study_duration in STUDY_DURATION_WEEKS:
+        return STUDY_DURATION_WEEKS[study_duration]
+    weeks = parse_weeks(study_duration)
+    return weeks if weeks else DEFAULT_BUDGET_WEEKS
+
+
+def _row_bits(matrix):
+    """Python int bitset of the column ids in each CSR row"""
+    indptr, indices = matrix.indptr.tolist(), matrix.indices.tolist()
+    bits = []
+    for start, stop in zip(indptr[:-1], indptr[1:]):
+        row = 0
+        for column in indices[start:stop]:
+            row |= 1 << column
+        bits.append(row)
+    return bits
+
+
+def _bits_array(bits, size):
+    """Boolean array of the first ``size`` bits of a Python int bitset"""
+    packed = np.frombuffer(bits.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder='little').astype(bool)
+
+
+def _array_bits(array):
+    """Python int bitset of a boolean array"""
+    return int.from_bytes(np.packbits(array, bitorder='little').tobytes(), 'little')
+
+
+def _iter_bits(bits, limit=None):
+    """Set bit positions, lowest first"""
+    found = 0
+    while bits and (limit is None or found < limit):
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+        found += 1
+
+
+def _closure(edges):
+    """Per node, the bitset of nodes reachable from it (itself included), via the SCC condensation"""
+    n_components, labels = connected_components(edges, directed=True, connection='strong')
+    members = [0] * n_components
+    for node, label in enumerate(labels.tolist()):
+        members[label] |= 1 << node
+    coo = edges.tocoo()
+    successors = [set() for _ in range(n_components)]
+    indegree = [0] * n_components
+    for a, b in zip(labels[coo.row].tolist(), labels[coo.col].tolist()):
+        if a != b and b not in successors[a]:
+            successors[a].add(b)
+            indegree[b] += 1
+
+    # Kahn's order, then fold reachability back from the sinks
+    order = [c for c in range(n_components) if indegree[c] == 0]
+    for c in order:
+        for d in successors[c]:
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                order.append(d)
+    reach = members[:]
+    for c in reversed(order):
+        for d in successors[c]:
+            reach[c] |= reach[d]
+    return [reach[label] for label in labels.tolist()]
+
+
+class PrerequisiteGraph:
+    """A catalog version compiled for planning: skill->course DAG plus reachability closures
+
+    Courses teach skills (skills_covered) and require skills (prerequisites).
+    Skill a leads to skill b when some course requires a and teaches b;
+    ``requires[s]`` holds every skill that may be needed before s can be
+    learned. The closure treats prerequisites as alternatives, so it
+    over-approximates and is only used to prune; the beam search checks real
+    prerequisites. Prerequisites no chain of catalog courses can teach (see
+    learnable) are left to the user and do not block a course.
+    """
+
+    def __init__(self, engine, weeks):
+        self.engine = engine
+        self.weeks = weeks  # Length of each catalog row in weeks (see course_weeks)
+        n_skills = engine.n_skills
+        active = np.ones(engine.n_courses, dtype=bool)
+        active[engine.removed] = False
+        self.active = active
+
+        teaches = engine.skill_matrix.astype(bool).astype(np.int32)
+        requires = engine.prereq_matrix.astype(bool).astype(np.int32)
+        self.teach_bits = _row_bits(teaches)
+        self.prereq_bits = _row_bits(requires)
+
+        # Teachers of each skill, shortest course first (tombstoned courses left out)
+        coo = teaches.tocoo()
+        keep = active[coo.row]
+        rows, skills = coo.row[keep], coo.col[keep]
+        order = np.lexsort((rows, self.weeks[rows], skills))
+        self.teacher_rows = rows[order]
+        self.teacher_ptr = np.concatenate([[0], np.cumsum(np.bincount(skills, minlength=n_skills))])
+
+        self.required_by = requires[active].tocsr()
+        self.taught_by = teaches[active].T.tocsr()
+        skill_edges = (self.required_by.T @ self.taught_by.T).tocsr()
+        self.requires = _closure(skill_edges.T.tocsr())
+        self.free = self.learnable(0)  # Skills learnable without knowing any
+
+    def learnable(self, known):
+        """Bitset of every skill some chain of catalog courses teaches starting from ``known``
+
+        Exact, unlike the closures: a course counts only once all its
+        prerequisites are known or learnable.
+        """
+        skills = _bits_array(known, self.engine.n_skills)
+        while True:
+            ready = (self.required_by @ ~skills).astype(bool) == 0
+            learned = skills | (self.taught_by @ ready).astype(bool)
+            if (learned == skills).all():
+                return known | _array_bits(skills)
+            skills = learned
+
+    def teachers(self, skill):
+        return self.teacher_rows[self.teacher_ptr[skill]:self.teacher_ptr[skill + 1]]
+
+    def plan(self, profile, budget_weeks, goals, goal_weights, beam_width=BEAM_WIDTH, max_steps=MAX_STEPS):
+        """Ordered catalog rows from the user's skills towards the goal courses within budget_weeks
+
+        Beam search over (known skills, courses taken): a step either takes a
+        goal course whose learnable prerequisites are met or a course teaching
+        a skill the remaining goals need (directly, or transitively per
+        ``requires``). The best plan reaches the most goal weight, then takes
+        the fewest weeks; it ends once no goal is left that fits the budget.
+        """
+        vocabulary = self.engine.vocabulary
+        known = profile.skill_bits(vocabulary) & ((1 << self.engine.n_skills) - 1)
+        learnable = self.learnable(known | self.free)
+        weights = dict(zip(goals, goal_weights))
+        goals = [g for g in goals if self.weeks[g] <= budget_weeks]
+        goals.sort(key=lambda g: -weights[g])
+        if not goals:
+            return []
+
+        # (known skills, taken rows, weeks used, goal weight reached)
+        start = (known, (), 0.0, 0.0)
+        best = start
+        beam = [start]
+        for _ in range(max_steps):
+            children, seen = [], set()
+            for state in beam:
+                skills, taken, weeks, value = state
+                for row in self._next_steps(state, goals, budget_weeks, learnable):
+                    child = (skills | self.teach_bits[row], taken + (row,), weeks + self.weeks[row],
+                             value + weights.get(row, 0.0))
+                    key = (child[0], frozenset(child[1]))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    children.append((-self._promise(child, goals, weights, learnable), child[2], child[1], child))
+                    if (child[3], -child[2]) > (best[3], -best[2]):
+                        best = child
+            if not children:
+                break
+            children.sort(key=lambda ranked: ranked[:3])
+            beam = [ranked[3] for ranked in children[:beam_width]]
+
+        # Trailing prerequisite courses that lead to no reached goal are dropped
+        taken = list(best[1])
+        while taken and taken[-1] not in weights:
+            taken.pop()
+        return taken
+
+    def _promise(self, state, goals, weights, learnable):
+        """Goal weight reached plus partial credit for the best goal's prerequisites already met"""
+        skills, taken, _, value = state
+        progress = 0.0
+        for goal in goals:
+            needed = self.prereq_bits[goal] & learnable
+            if needed and goal not in taken:
+                met = bin(needed & skills).count('1') / bin(needed).count('1')
+                progress = max(progress, 0.5 * met * weights[goal])
+        return value + progress
+
+    def _next_steps(self, state, goals, budget_weeks, learnable):
+        """Rows a state may take next: goals whose prerequisites are met, then courses teaching missing ones"""
+        skills, taken, weeks, _ = state
+        left = budget_weeks - weeks
+        steps = []
+        missing = 0
+        for goal in goals:  # Highest weight first
+            if goal in taken or self.weeks[goal] > left:
+                continue
+            gap = self.prereq_bits[goal] & learnable & ~skills
+            if gap == 0:
+                if len(steps) < BRANCHING:
+                    steps.append(goal)
+            else:
+                missing |= gap
+        if not missing:
+            return steps
+
+        # Direct prerequisites first, then skills they transitively depend on
+        deeper = 0
+        for skill in _iter_bits(missing):
+            deeper |= self.requires[skill]
+        deeper &= learnable & ~skills & ~missing
+        limit = len(steps) + BRANCHING
+        for skill in list(_iter_bits(missing)) + list(_iter_bits(deeper, BRANCHING)):
+            for row in self.teachers(skill)[:TEACHER_SCAN].tolist():
+                if (row in steps or row in taken or self.weeks[row] > left
+                        or self.prereq_bits[row] & learnable & ~skills or self.teach_bits[row] & ~skills == 0):
+                    continue
+                steps.append(row)
+                if len(steps) >= limit:
+                    return steps
+        return steps
+
+
+def course_weeks(courses, engine):
+    """Weeks per catalog row from its duration text (a CourseTable column), else from its level"""
+    rows = np.arange(engine.n_courses)
+    durations = courses.columns['duration'].take(rows) if 'duration' in courses.columns else [None] * len(rows)
+    by_level = [LEVEL_WEEKS.get(level, DEFAULT_COURSE_WEEKS) for level in LEVELS] + [DEFAULT_COURSE_WEEKS]
+    parsed = {}
+    weeks = np.empty(len(rows), dtype=np.float64)
+    for row, (duration, level) in enumerate(zip(durations, engine.level_codes.tolist())):
+        key = duration if isinstance(duration, str) else None
+        if key not in parsed:
+            parsed[key] = parse_weeks(key)
+        weeks[row] = parsed[key] or by_level[level]
+    return weeks
+
+
+def domain_hits(engine, target_domain):
+    """Boolean per course: in the target domain, else in a broader domain it names ('marketing' for 'digital marketing')"""
+    hits = engine._domain_hits(target_domain)
+    if target_domain and not hits.any():
+        broader = np.array([bool(d) and d in target_domain for d in engine.domain_values], dtype=bool)
+        hits = broader[engine.domain_codes]
+    return hits
+
+
+def choose_goals(engine, profile, scores, n_goals=GOAL_CANDIDATES, share=GOAL_SCORE_SHARE):
+    """Goal sets for plan to try in turn, each (rows, weights): target-domain courses, then the best overall
+
+    The overall best are only meant for profiles none of whose target-domain
+    goals fits (plan returns no steps). Courses scoring below ``share`` of
+    their set's best score are left out, so weak matches do not pad a plan.
+    """
+    hits = domain_hits(engine, profile.target_domain)
+    candidates = [select_top(np.where(hits, scores, -1), n_goals)[0]] if hits.any() else []
+    candidates.append(select_top(scores, n_goals)[0])
+    goal_sets = []
+    for goals in candidates:
+        if len(goals):
+            goals = goals[scores[goals] >= share * scores[goals[0]]]
+            goal_sets.append((goals.tolist(), (scores[goals] / 100.0).tolist()))
+    return goal_sets
+
+
+def timeline_of(end_week):
+    """(plan key, timeline label) of a step finishing in end_week"""
+    for plan, label, limit in TIMELINE_WEEKS:
+        if limit is None or end_week <= limit:
+            return plan, label
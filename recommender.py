@@ -1,45 +1,380 @@
 # recommender.py - AI Matching Engine
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scoring import ScoringEngine, RankCursor, LEVELS, LEVEL_MATRIX, select_top
+from course_index import CourseIndex
+from text_features import fit_tfidf
+from json_output import FragmentTable
+from course_table import CourseTable
+from vector_index import EMBEDDING_DIM, Projection, build_index
+from path_planner import PrerequisiteGraph, course_weeks, choose_goals, study_budget_weeks, timeline_of
+from buffers import CsrBuffer
+from catalog_store import DISPLAY_COLUMNS
+from skill_vocab import SkillVocabulary, count_in, has_skill, normalize_skill
+from user_profile import UserProfile
+from result_cache import ResultCache, RESULT_CACHE_SIZE, RESULT_CACHE_TTL
+from sharding import ShardedScorer, SHARD_MIN_COURSES
+from text_templates import configured_templates, timelines
+from instrumentation import stage, count, timed
+
+DISPLAY_FIELDS = frozenset(DISPLAY_COLUMNS)
+
+# Background compaction starts once this share of the catalog has changed
+COMPACT_RATIO = 0.1
+COMPACT_MIN_CHANGES = 1000
+
+
+def _search_params(n_probe):
+    """Vector index search parameters for a per-call n_probe (None keeps the index default)"""
+    return {} if n_probe is None else {'n_probe': n_probe}
+
+
+def _cache_key(profile, top_n, version, candidate_k=None, offset=0, n_probe=None):
+    """Result cache key; single and batch requests for the same page share it"""
+    return (profile, top_n, candidate_k, offset, n_probe, version)
+
+
+class CatalogState:
+    """One catalog version: course metadata, TF-IDF features, scoring arrays and index
+    
+    A published state is never modified. Updates build a new state and swap it
+    in with a single assignment, so a request that reads the state once never
+    sees a half-applied change.
+    """
+    
+    def __init__(self, courses_df, vectorizer, course_features, scoring_engine, course_index, version,
+                 projection=None, vector_index=None):
+        self.courses = CourseTable(courses_df)  # Columnar metadata; updates append to it
+        self.vectorizer = vectorizer
+        self.course_features = course_features
+        self.features_buffer = None
+        self.scoring_engine = scoring_engine
+        self.course_index = course_index
+        self.version = version
+        # Dense course vectors for candidate retrieval; None retrieves with the sparse TF-IDF rows
+        self.projection = projection
+        self.vector_index = vector_index
+        # Pre-encoded JSON output fragments; shared by later versions since entries are validated on use
+        self.json_fragments = FragmentTable()
+        self.planner = None  # PrerequisiteGraph, compiled by the first plan on this version
+        # Writer-side lookup, shared between versions and patched under the write lock
+        self.rows_by_id = {course_id: row for row, course_id in enumerate(courses_df['id'].tolist())}
+    
+    def replace(self, **changes):
+        """Shallow copy of the state with some fields swapped"""
+        state = object.__new__(CatalogState)
+        state.__dict__.update(self.__dict__, **changes)
+        return state
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['planner'] = None  # Cheaper to recompile than to persist
+        return state
+    
+    def prerequisite_graph(self):
+        """This version's PrerequisiteGraph, compiled on first use"""
+        if self.planner is None:
+            with stage('compile_planner'):
+                self.planner = PrerequisiteGraph(self.scoring_engine, course_weeks(self.courses, self.scoring_engine))
+        return self.planner
+    
+    @property
+    def n_courses(self):
+        return self.scoring_engine.n_courses
+    
+    @property
+    def courses_df(self):
+        """All catalog rows, including tombstoned ones, as one DataFrame (built on demand)"""
+        return self.courses.to_frame()
+    
+    def live_courses(self):
+        """Catalog without tombstoned rows"""
+        live = np.setdiff1d(np.arange(self.n_courses), self.scoring_engine.removed)
+        return self.courses.to_frame(live)
+    
+    def course_rows(self, rows, catalog_store=None):
+        """Course dicts for the given catalog rows, in order
+        
+        Display columns missing from a column-pruned catalog are fetched from
+        ``catalog_store`` for just these rows.
+        """
+        courses = self.courses.records(rows)
+        lacking = [i for i, course in enumerate(courses) if not DISPLAY_FIELDS.issubset(course)]
+        if lacking and catalog_store is not None:
+            details = catalog_store.fetch([courses[i]['id'] for i in lacking], DISPLAY_COLUMNS)
+            for i, extra in zip(lacking, details.to_dict('records')):
+                courses[i].update(extra)
+        return courses
+    
+    def retrieve_candidates(self, query_text, candidate_k, **search_params):
+        """Indices of the candidate_k courses most similar to the query in TF-IDF space
+        
+        With a vector index the search runs over its dense vectors instead;
+        ``search_params`` (e.g. n_probe) tune its recall/latency trade-off.
+        """
+        query = self.vectorizer.transform([query_text])
+        if self.vector_index is not None:
+            ids = self.vector_index.search(self.projection.transform(query), candidate_k, **search_params)[0][0]
+            return np.sort(ids[ids >= 0])
+        # TF-IDF rows are L2-normalized, so the sparse dot product is the cosine similarity
+        similarity = (self.course_features @ query.T).toarray().ravel()
+        
+        k = min(candidate_k, len(similarity))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        candidates = np.argpartition(-similarity, k - 1)[:k]
+        return np.sort(candidates)  # Catalog order keeps tie-breaking identical to the exhaustive path
 
 class CareerRecommender:
-    def __init__(self, courses_df):
-        self.courses_df = courses_df
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-        self._train_model()
+    def __init__(self, courses_df, auto_compact=True, catalog_store=None,
+                 cache_size=RESULT_CACHE_SIZE, cache_ttl=RESULT_CACHE_TTL,
+                 n_shards=None, shard_min_courses=SHARD_MIN_COURSES, vector_index=None, vector_params=None,
+                 templates=None):
+        self.auto_compact = auto_compact
+        # 'exact' or 'ivf' retrieves candidate_k courses from dense vectors (vector_params go to its build)
+        self.vector_backend = vector_index
+        self.vector_params = dict(vector_params or {})
+        # With n_shards > 1, catalogs of at least shard_min_courses are scored on a process pool
+        self.n_shards = n_shards
+        self.shard_min_courses = shard_min_courses
+        self._sharded = None  # ShardedScorer, started by the first sharded request
+        # Ranked results per (profile, request, catalog version); cache_size=0 disables it
+        self.result_cache = ResultCache(cache_size, cache_ttl)
+        self.catalog_store = catalog_store  # Source of display columns left out of courses_df
+        # Justification texts (text_templates.TemplateSet); a deployment setting, so never pickled
+        self.templates = templates or configured_templates()
+        self.vocabulary = SkillVocabulary()  # Shared by every catalog version, so skill ids never change
+        self._write_lock = threading.Lock()
+        self._compaction = None  # Running compaction thread
+        self._pending = None  # Updates applied while a compaction runs, replayed on its result
+        self._changes = 0  # Rows changed since the last full build
+        self._state = self._build_state(courses_df, version=0)
     
-    def _train_model(self):
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('_write_lock', '_compaction', '_pending', 'catalog_store', '_sharded', 'templates'):
+            del state[name]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._write_lock = threading.Lock()
+        self._compaction = None
+        self._pending = None
+        self.catalog_store = None
+        self._sharded = None
+        self.templates = configured_templates()
+    
+    def close(self):
+        """Stop the shard worker processes and free their shared memory (if they were started)"""
+        if self._sharded is not None:
+            self._sharded.close()
+            self._sharded = None
+    
+    # Read-only views of the current catalog version
+    @property
+    def courses_df(self):
+        return self._state.courses_df
+    
+    @property
+    def vectorizer(self):
+        return self._state.vectorizer
+    
+    @property
+    def course_features(self):
+        return self._state.course_features
+    
+    @property
+    def feature_names(self):
+        return self._state.vectorizer.feature_names()
+    
+    @property
+    def scoring_engine(self):
+        return self._state.scoring_engine
+    
+    @property
+    def vector_index(self):
+        """The current version's VectorIndex, or None without a vector_index backend"""
+        return self._state.vector_index
+    
+    @property
+    def json_fragments(self):
+        """FragmentTable for json_output.render_json_output"""
+        return self._state.json_fragments
+    
+    @property
+    def course_index(self):
+        return self._state.course_index
+    
+    @property
+    def catalog_version(self):
+        """Increases with every catalog update and compaction"""
+        return self._state.version
+    
+    def _build_state(self, courses_df, version):
+        """Fit every catalog-derived structure from scratch"""
+        vectorizer, course_features = self._train_model(courses_df)
+        with stage('build_index'):
+            scoring_engine = ScoringEngine(courses_df, self.vocabulary)
+            course_index = CourseIndex(scoring_engine)
+        projection = vector_index = None
+        if self.vector_backend is not None:
+            with stage('build_vector_index'):
+                params = dict(self.vector_params)
+                projection = Projection.fit(course_features, params.pop('dim', EMBEDDING_DIM))
+                vector_index = build_index(self.vector_backend, projection.transform(course_features), **params)
+        return CatalogState(courses_df, vectorizer, course_features, scoring_engine, course_index, version,
+                            projection, vector_index)
+    
+    def _train_model(self, courses_df):
         """Prepare course features for semantic matching"""
+        with stage('train_model'):
+            return fit_tfidf(self._course_texts(courses_df))
+    
+    @staticmethod
+    def _course_texts(courses_df):
+        """Combine all relevant text for semantic matching"""
         course_texts = []
-        for _, course in self.courses_df.iterrows():
-            # Combine all relevant text for semantic matching
+        for _, course in courses_df.iterrows():
             text = f"{course['title']} {' '.join(course['skills_covered'])} {course['career_path']} {course['domain']}"
             course_texts.append(text)
+        return course_texts
+    
+    def retrieve_candidates(self, user_profile, candidate_k, **search_params):
+        """Indices of the candidate_k courses most similar to the profile in TF-IDF space"""
+        return self._state.retrieve_candidates(UserProfile.of(user_profile).text(), candidate_k, **search_params)
+    
+    def add_courses(self, courses):
+        """Append courses (DataFrame or list of dicts) without refitting the model"""
+        self._apply_update('add', self._as_frame(courses))
+    
+    def update_course(self, course):
+        """Replace the course that has the same id"""
+        self._apply_update('update', self._as_frame([course]))
+    
+    def remove_course(self, course_id):
+        """Drop a course from all future recommendations"""
+        self._apply_update('remove', course_id)
+    
+    def compact(self, wait=False):
+        """Rebuild everything from the live courses (refreshing IDF) in a background thread"""
+        with self._write_lock:
+            if self._compaction is None:
+                self._pending = []
+                self._compaction = threading.Thread(target=self._compact, args=(self._state,), daemon=True)
+                self._compaction.start()
+            thread = self._compaction
+        if wait:
+            thread.join()
+        return thread
+    
+    @staticmethod
+    def _as_frame(courses):
+        if isinstance(courses, pd.DataFrame):
+            return courses.reset_index(drop=True)
+        return pd.DataFrame(list(courses))
+    
+    def _apply_update(self, kind, payload):
+        """Apply one update to the current state and publish the result"""
+        with self._write_lock:
+            self._state = self._updated_state(self._state, kind, payload)
+            self.result_cache.clear()
+            if self._pending is not None:
+                self._pending.append((kind, payload))
+            self._changes += 1 if kind == 'remove' else len(payload)
+            threshold = max(COMPACT_MIN_CHANGES, COMPACT_RATIO * self._state.n_courses)
+            start_compaction = self.auto_compact and self._compaction is None and self._changes >= threshold
+        if start_compaction:
+            self.compact()
+    
+    def _updated_state(self, state, kind, payload):
+        """New state with one update applied; touches only the changed courses' rows"""
+        rows_by_id = state.rows_by_id
+        if kind == 'remove':
+            if payload not in rows_by_id:
+                raise KeyError(f"Unknown course id: {payload}")
+            ids, removed = [], [rows_by_id[payload]]
+        else:
+            ids = payload['id'].tolist()
+            if len(set(ids)) != len(ids):
+                raise ValueError("Duplicate course ids in update")
+            if kind == 'add':
+                existing = [course_id for course_id in ids if course_id in rows_by_id]
+                if existing:
+                    raise ValueError(f"Course ids already in catalog: {existing}")
+                removed = []
+            else:
+                missing = [course_id for course_id in ids if course_id not in rows_by_id]
+                if missing:
+                    raise KeyError(f"Unknown course id: {missing[0]}")
+                removed = [rows_by_id[course_id] for course_id in ids]
+        
+        changes = {'version': state.version + 1, 'planner': None}
+        engine = state.scoring_engine.without(removed) if removed else state.scoring_engine
+        if ids:
+            # New rows reuse the fitted vocabulary; terms it lacks wait for the next compaction
+            engine = engine.extended(payload)
+            new_features = state.vectorizer.transform(self._course_texts(payload))
+            features_buffer = (state.features_buffer or CsrBuffer(state.course_features)).extend(
+                state.n_courses, new_features)
+            changes['features_buffer'] = features_buffer
+            changes['course_features'] = features_buffer.view()
+            changes['courses'] = state.courses.extended(payload)
+            if state.vector_index is not None:
+                changes['vector_index'] = state.vector_index.extended(
+                    state.n_courses, state.projection.transform(new_features))
+        changes['scoring_engine'] = engine
+        changes['course_index'] = state.course_index.extended(engine)
         
-        self.course_features = self.vectorizer.fit_transform(course_texts)
-        self.feature_names = self.vectorizer.get_feature_names_out()
+        if kind == 'remove':
+            del rows_by_id[payload]
+        for offset, course_id in enumerate(ids):
+            rows_by_id[course_id] = state.n_courses + offset
+        return state.replace(**changes)
+    
+    def _compact(self, state):
+        """Background body of compact(): full rebuild, then replay updates made meanwhile"""
+        try:
+            compacted = self._build_state(state.live_courses(), state.version + 1)
+        except Exception:
+            with self._write_lock:
+                self._pending = None
+                self._compaction = None
+            raise
+        
+        with self._write_lock:
+            try:
+                for kind, payload in self._pending:
+                    compacted = self._updated_state(compacted, kind, payload)
+                self._state = compacted
+                self.result_cache.clear()
+                self._changes = sum(1 if kind == 'remove' else len(payload) for kind, payload in self._pending)
+            finally:
+                self._pending = None
+                self._compaction = None
     
     def calculate_match_score(self, user_profile, course):
         """Calculate comprehensive match score (0-100)"""
         score = 0
         
-        # 1. Skill matching (40 points)
-        user_skills = [s.lower().strip() for s in user_profile['technical_skills']]
-        course_skills = [s.lower().strip() for s in course['skills_covered']]
+        # Course skills are interned first so user skills only need a lookup
+        profile = UserProfile.of(user_profile)
+        course_skills = self.vocabulary.intern_all(course['skills_covered'])
+        prereqs = [self.vocabulary.intern(normalize_skill(p)) for p in course['prerequisites']]
+        user_skills = profile.skill_bits(self.vocabulary)
         
-        skill_matches = len(set(user_skills) & set(course_skills))
-        total_course_skills = max(len(course_skills), 1)  # Avoid division by zero
+        # 1. Skill matching (40 points)
+        skill_matches = count_in(course_skills, user_skills)
+        total_course_skills = max(len(course['skills_covered']), 1)  # Avoid division by zero
         score += (skill_matches / total_course_skills) * 40
         
         # 2. Level appropriateness (25 points)
-        user_level = self._get_user_level(user_profile)
         course_level = course['level']
-        score += self._calculate_level_score(user_level, course_level)
+        score += self._calculate_level_score(profile.level, course_level)
         
         # 3. Prerequisite satisfaction (20 points)
-        missing_prereqs = len([p for p in course['prerequisites'] if p.lower() not in user_skills])
+        missing_prereqs = len([p for p in prereqs if not has_skill(user_skills, p)])
         if missing_prereqs == 0:
             score += 20
         elif missing_prereqs == 1:
@@ -50,105 +385,256 @@ class CareerRecommender:
             score += 5
         
         # 4. Career goal alignment (15 points)
-        target_domain = user_profile.get('target_domain', '').lower()
+        target_domain = profile.target_domain
         if target_domain and (target_domain in course['domain'].lower() or 
                              target_domain in course['career_path'].lower()):
             score += 15
         
         return min(100, int(score))
     
-    def _get_user_level(self, user_profile):
-        """Determine user skill level based on experience and skills"""
-        skills_count = len(user_profile['technical_skills'])
-        experience = user_profile.get('experience_years', 0)
-        
-        if skills_count <= 3 or experience < 1:
-            return 'beginner'
-        elif skills_count <= 6 or experience < 3:
-            return 'intermediate'
-        else:
-            return 'advanced'
-    
     def _calculate_level_score(self, user_level, course_level):
         """Calculate score based on level matching"""
-        level_matrix = {
-            ('beginner', 'beginner'): 25,
-            ('beginner', 'intermediate'): 15,
-            ('beginner', 'advanced'): 5,
-            ('intermediate', 'beginner'): 10,
-            ('intermediate', 'intermediate'): 25,
-            ('intermediate', 'advanced'): 20,
-            ('advanced', 'beginner'): 5,
-            ('advanced', 'intermediate'): 15,
-            ('advanced', 'advanced'): 25
-        }
-        return level_matrix.get((user_level, course_level), 10)
+        return LEVEL_MATRIX.get((user_level, course_level), 10)
     
-    def generate_recommendations(self, user_profile, top_n=10):
-        """Generate ranked course recommendations with justifications"""
-        recommendations = []
+    def generate_recommendations(self, user_profile, top_n=10, candidate_k=None, offset=0, n_probe=None):
+        """Generate ranked course recommendations with justifications
         
-        for _, course in self.courses_df.iterrows():
-            match_score = self.calculate_match_score(user_profile, course)
-            
-            if match_score >= 20:  # Only include courses with reasonable match
-                justification = self._generate_justification(user_profile, course, match_score)
-                timeline = self._determine_timeline(user_profile, course)
-                
-                recommendations.append({
-                    'course_id': course['id'],
-                    'title': course['title'],
-                    'provider': course['provider'],
-                    'duration': course['duration'],
-                    'level': course['level'],
-                    'cost': course['cost'],
-                    'match_score': match_score,
-                    'justification': justification,
-                    'timeline': timeline,
-                    'career_path': course['career_path'],
-                    'domain': course['domain'],
-                    'skills_covered': course['skills_covered'],
-                    'prerequisites': course['prerequisites'],
-                    'link': course['link']
-                })
-        
-        # Sort by match score (highest first) and return top N
-        recommendations.sort(key=lambda x: x['match_score'], reverse=True)
-        return recommendations[:top_n]
-    
-    def _generate_justification(self, user_profile, course, score):
-        """Generate human-readable justification for recommendation"""
-        user_skills = [s.lower() for s in user_profile['technical_skills']]
-        course_skills = [s.lower() for s in course['skills_covered']]
-        
-        matching_skills = set(user_skills) & set(course_skills)
-        new_skills = set(course_skills) - set(user_skills)
-        missing_prereqs = [p for p in course['prerequisites'] if p.lower() not in user_skills]
-        
-        if score >= 80:
-            return f"🎯 Excellent fit! You have {len(matching_skills)} required skills. This will add {len(new_skills)} new skills to your toolkit."
-        elif score >= 60:
-            return f"✅ Strong match. Builds on your {len(matching_skills)} existing skills. You'll learn {len(new_skills)} new technologies."
-        elif score >= 40:
-            if missing_prereqs:
-                return f"⚠️ Good potential. Learn {len(new_skills)} new skills. Consider brushing up on: {', '.join(missing_prereqs[:2])}"
-            else:
-                return f"📈 Solid option. Expands your skillset with {len(new_skills)} new technologies."
+        By default the inverted index finds the exact top N while visiting only
+        courses that share a skill or the target domain with the user. With
+        candidate_k set, only the candidate_k courses retrieved by TF-IDF
+        similarity are scored instead; n_probe overrides the IVF vector
+        index's cells searched for them (recall vs latency). With offset set,
+        ranks offset+1 to offset+top_n are returned (one page of a paginated
+        list).
+        
+        Results are cached per canonical profile and catalog version.
+        """
+        state = self._state
+        profile = UserProfile.of(user_profile)
+        key = _cache_key(profile, top_n, state.version, candidate_k, offset, n_probe)
+        recommendations = self.result_cache.get(key)
+        if recommendations is None:
+            count('result_cache_misses')
+            recommendations = self._recommend(state, profile, top_n, candidate_k, offset, n_probe)
+            self.result_cache.put(key, recommendations)
         else:
-            return f"🎓 Learning opportunity. Challenges you with {len(new_skills)} new skills. Prepare by learning prerequisites first."
+            count('result_cache_hits')
+        return [dict(r) for r in recommendations]  # Callers may modify their copies
     
-    def _determine_timeline(self, user_profile, course):
-        """Determine if course is short-term, medium-term, or long-term"""
-        user_level = self._get_user_level(user_profile)
-        course_level = course['level']
+    def _recommend(self, state, profile, top_n, candidate_k=None, offset=0, n_probe=None):
+        """Uncached body of generate_recommendations"""
+        sharded = self._sharded_scorer(state)
+        with stage('score'):
+            if candidate_k is None and sharded is not None:
+                top, scores = sharded.top_batch(state.scoring_engine, [profile], offset + top_n)[0]
+                count('candidates_scored', state.n_courses)
+            elif candidate_k is None:
+                top, scores = state.course_index.top(profile, offset + top_n)
+            else:
+                with stage('retrieve_candidates'):
+                    candidates = state.retrieve_candidates(profile.text(), candidate_k, **_search_params(n_probe))
+                candidate_scores = state.scoring_engine.score(profile, candidates)
+                count('candidates_scored', len(candidates))
+                best = select_top(candidate_scores, offset + top_n)[0]
+                top, scores = candidates[best], candidate_scores[best]
+        
+        # Ranked by match score (highest first), ties in catalog order
+        return self._build_recommendations(state, profile, top[offset:], scores[offset:])
+    
+    def plan_learning_path(self, user_profile, study_duration=None):
+        """Ordered course plan towards the target domain that fits the study duration
         
-        if user_level == course_level:
-            return 'short-term'  # 1-3 months
-        elif (user_level, course_level) in [('beginner', 'intermediate'), ('intermediate', 'advanced')]:
-            return 'medium-term'  # 3-6 months
+        Unlike create_learning_path, which buckets a recommendation list by
+        level, this searches the prerequisite graph: every step's
+        prerequisites are covered by the user's skills or earlier steps, and
+        the plan ends by the profile's study_duration (its weeks budget).
+        Prerequisites no catalog course can teach are listed in the step's
+        'brush_up' instead. Goals come from the target domain; the best
+        courses overall are only planned when no target-domain course fits.
+        Returns create_learning_path's three plans, bucketed by the week each
+        step ends, plus 'path' (the ordered steps), 'total_weeks' and
+        'budget_weeks'.
+        """
+        state = self._state
+        profile = UserProfile.of(user_profile)
+        if study_duration is None and isinstance(user_profile, dict):
+            study_duration = user_profile.get('study_duration')
+        budget = study_budget_weeks(study_duration)
+        graph = state.prerequisite_graph()
+        with stage('plan_path'):
+            scores = state.scoring_engine.score(profile)
+            rows, goals = [], []
+            for goals, weights in choose_goals(state.scoring_engine, profile, scores):
+                rows = graph.plan(profile, budget, goals, weights)
+                if rows:
+                    break
+        records = self._build_recommendations(state, profile, rows, scores[rows])
+        
+        learning_path = {'short_term_plan': [], 'medium_term_plan': [], 'long_term_plan': [], 'path': []}
+        known = profile.skill_bits(self.vocabulary)
+        week = 0.0
+        for row, record in zip(rows, records):
+            start, week = week, week + float(graph.weeks[row])
+            plan, record['timeline'] = timeline_of(week)
+            unmet = graph.prereq_bits[row] & ~known
+            learned = graph.teach_bits[row] & ~known
+            known |= learned
+            learning_path[plan].append(record)
+            learning_path['path'].append({
+                'course_id': record['course_id'],
+                'title': record['title'],
+                'start_week': round(start, 1),
+                'end_week': round(week, 1),
+                'purpose': 'goal' if row in goals else 'prerequisite',
+                'new_skills': self.vocabulary.names(i for i in range(learned.bit_length()) if learned >> i & 1),
+                'brush_up': self.vocabulary.names(i for i in range(unmet.bit_length()) if unmet >> i & 1)
+            })
+        learning_path['total_weeks'] = round(week, 1)
+        learning_path['budget_weeks'] = budget
+        return learning_path
+    
+    def _sharded_scorer(self, state):
+        """The process-pool scorer if sharding is enabled and the catalog is large enough, else None"""
+        if not self.n_shards or self.n_shards < 2 or state.n_courses < self.shard_min_courses:
+            return None
+        with self._write_lock:
+            if self._sharded is None:
+                self._sharded = ShardedScorer(self.n_shards)
+            return self._sharded
+    
+    def iter_recommendations(self, user_profile, page_size=10, candidate_k=None, n_probe=None):
+        """Yield pages of ranked recommendations on demand (for a "show more" UI)
+        
+        The pages join up to generate_recommendations with a larger top_n. The
+        catalog version is pinned when iteration starts, so later pages stay
+        consistent while the catalog is updated. Only the first page is cheap:
+        the index answers it, and every later page reuses one full scoring pass.
+        n_probe is passed to the vector index as in generate_recommendations.
+        """
+        state = self._state
+        profile = UserProfile.of(user_profile)
+        if candidate_k is None:
+            top, scores = state.course_index.top(profile, page_size)
+            if len(top) == 0:
+                return
+            yield self._build_recommendations(state, profile, top, scores)
+            if len(top) < page_size:
+                return
+            candidates = None
+            cursor = RankCursor(state.scoring_engine.score(profile), skip=page_size)
         else:
-            return 'long-term'  # 6-12 months
-
+            candidates = state.retrieve_candidates(profile.text(), candidate_k, **_search_params(n_probe))
+            cursor = RankCursor(state.scoring_engine.score(profile, candidates))
+        
+        while len(cursor):
+            top, scores = cursor.next(page_size)
+            if candidates is not None:
+                top = candidates[top]
+            yield self._build_recommendations(state, profile, top, scores)
+    
+    def generate_recommendations_batch(self, profiles, top_n=10, n_jobs=None):
+        """Generate recommendations for many profiles with one matrix scoring pass
+        
+        Cached profiles are answered from the result cache; only the rest are scored.
+        """
+        state = self._state
+        profiles = [UserProfile.of(p) for p in profiles]
+        keys = [_cache_key(profile, top_n, state.version) for profile in profiles]
+        results = [self.result_cache.get(key) for key in keys]
+        
+        misses = list({profile: None for profile, result in zip(profiles, results) if result is None})
+        count('result_cache_hits', sum(result is not None for result in results))
+        count('result_cache_misses', sum(result is None for result in results))
+        if misses:
+            sharded = self._sharded_scorer(state)
+            with stage('score_batch'):
+                if sharded is not None:
+                    ranked = sharded.top_batch(state.scoring_engine, misses, top_n)
+                else:
+                    ranked = state.scoring_engine.top_batch(misses, top_n, n_jobs=n_jobs)
+            count('candidates_scored', state.n_courses * len(misses))
+            # Profiles in a batch share most of their top courses, so each course row is fetched once
+            with stage('materialize'):
+                unique_rows = np.unique(np.concatenate([top for top, _ in ranked]))
+                courses = dict(zip(unique_rows.tolist(), state.course_rows(unique_rows, self.catalog_store)))
+            # Text for every (profile, course) pair of the batch is rendered in one pass
+            users = np.repeat(np.arange(len(misses)), [len(top) for top, _ in ranked])
+            rows = np.concatenate([top for top, _ in ranked])
+            records = self._describe(state, misses, users, rows, np.concatenate([scores for _, scores in ranked]),
+                                     [courses[row] for row in rows.tolist()])
+            bounds = np.cumsum([0] + [len(top) for top, _ in ranked]).tolist()
+            computed = {profile: records[start:stop] for profile, start, stop in zip(misses, bounds, bounds[1:])}
+            for i, key in enumerate(keys):
+                if results[i] is None:
+                    results[i] = computed[key[0]]
+                    self.result_cache.put(key, results[i])
+        return [[dict(r) for r in recommendations] for recommendations in results]
+    
+    def retrieval_recall(self, profiles, candidate_k, top_n=10):
+        """Average share of the exhaustive top_n that the candidate_k retrieval stage also returns"""
+        state = self._state
+        recalls = []
+        for profile in map(UserProfile.of, profiles):
+            exact = select_top(state.scoring_engine.score(profile), top_n)[0]
+            if len(exact) == 0:
+                continue
+            candidates = state.retrieve_candidates(profile.text(), candidate_k)
+            scores = state.scoring_engine.score(profile, candidates)
+            retrieved = candidates[select_top(scores, top_n)[0]]
+            recalls.append(len(np.intersect1d(exact, retrieved)) / len(exact))
+        return float(np.mean(recalls)) if recalls else 1.0
+    
+    def _build_recommendations(self, state, profile, rows, scores, courses=None):
+        """Recommendation records for ranked catalog rows; only these rows are ever materialized
+        
+        ``courses`` maps rows to course Series already fetched for a whole batch.
+        """
+        with stage('materialize'):
+            if courses is None:
+                courses = state.course_rows(rows, self.catalog_store)
+            else:
+                courses = [courses[row] for row in np.asarray(rows).tolist()]
+        return self._describe(state, [profile], np.zeros(len(courses), dtype=np.intp), rows, scores, courses)
+    
+    def _describe(self, state, profiles, users, rows, scores, courses):
+        """Records for (profiles[users[i]], rows[i]) pairs; justifications and timelines in one vectorized pass"""
+        if len(courses) == 0:
+            return []
+        engine = state.scoring_engine
+        with stage('justification'):
+            matching, new, missing = engine.overlap_counts(profiles, users, rows)
+            
+            def missing_names(i):
+                user_bits = profiles[users[i]].skill_bits(self.vocabulary)
+                return [p for p in courses[i]['prerequisites']
+                        if not has_skill(user_bits, self.vocabulary.get(normalize_skill(p)))]
+            
+            justifications = self.templates.render(scores, matching, new, missing, missing_names)
+            user_levels = np.array([LEVELS.index(profile.level) for profile in profiles], dtype=np.intp)
+            labels = timelines(user_levels[users], engine.level_codes[np.asarray(rows, dtype=np.intp)])
+        return [self._recommendation_record(course, int(score), justification, timeline)
+                for course, score, justification, timeline in zip(courses, scores, justifications, labels)]
+    
+    @staticmethod
+    def _recommendation_record(course, match_score, justification, timeline):
+        return {
+            'course_id': course['id'],
+            'title': course['title'],
+            'provider': course['provider'],
+            'duration': course['duration'],
+            'level': course['level'],
+            'cost': course['cost'],
+            'match_score': match_score,
+            'justification': justification,
+            'timeline': timeline,
+            'career_path': course['career_path'],
+            'domain': course['domain'],
+            'skills_covered': course['skills_covered'],
+            'prerequisites': course['prerequisites'],
+            'link': course['link']
+        }
+    
+@timed('create_learning_path')
 def create_learning_path(recommendations):
     """Create structured learning path from recommendations"""
     short_term = [r for r in recommendations if r['timeline'] == 'short-term']
@@ -161,6 +647,7 @@ def create_learning_path(recommendations):
         'long_term_plan': long_term[:2]  # Next 6-12 months
     }
 
+@timed('generate_json_output')
 def generate_json_output(recommendations, learning_path):
     """Generate JSON output as required by problem statement"""
     output = {
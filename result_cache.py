@@ -0,0 +1,70 @@
+# result_cache.py - LRU/TTL Cache for Ranked Recommendation Results
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_SIZE = 1024  # Most cached results kept per recommender
+RESULT_CACHE_TTL = 300.0  # Seconds a cached result stays valid
+
+
+class ResultCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being stored
+
+    ``max_entries=0`` disables caching. Only the configuration survives pickling.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires at, value), least recently used first
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __getstate__(self):
+        return {'max_entries': self.max_entries, 'ttl': self.ttl}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_entries'], state['ttl'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Cached value for key, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Drop every entry (e.g. when the data behind them changed)"""
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        """Snapshot of hit/miss/eviction counters, current size and hit rate"""
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        return stats
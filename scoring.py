@@ -0,0 +1,315 @@
+# scoring.py - Vectorized Scoring Engine
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from buffers import ArrayBuffer, CsrBuffer
+from skill_vocab import SkillVocabulary, normalize_skill
+
+LEVELS = ['beginner', 'intermediate', 'advanced']
+
+LEVEL_MATRIX = {
+    ('beginner', 'beginner'): 25,
+    ('beginner', 'intermediate'): 15,
+    ('beginner', 'advanced'): 5,
+    ('intermediate', 'beginner'): 10,
+    ('intermediate', 'intermediate'): 25,
+    ('intermediate', 'advanced'): 20,
+    ('advanced', 'beginner'): 5,
+    ('advanced', 'intermediate'): 15,
+    ('advanced', 'advanced'): 25
+}
+
+# Courses below this score are never recommended
+MIN_MATCH_SCORE = 20
+
+# Upper bound on the dense users x courses block scored at once (~32 MB of float64)
+BATCH_CELLS = 4_000_000
+
+# Points for 0, 1, 2 and 3+ missing prerequisites
+PREREQ_TIERS = np.array([20, 15, 10, 5], dtype=np.float64)
+
+# Per-course arrays, in the order ScoringEngine._encode returns them
+COURSE_ARRAYS = ('skill_matrix', 'skill_counts', 'prereq_matrix', 'prereq_counts',
+                 'level_codes', 'domain_codes', 'career_codes')
+
+# Courses with an unknown level get code len(LEVELS) and score 10 for every user
+LEVEL_TABLE = np.array(
+    [[LEVEL_MATRIX.get((u, c), 10) for c in LEVELS + [None]] for u in LEVELS],
+    dtype=np.float64
+)
+
+
+class ScoringEngine:
+    """Scores every course for a profile with array operations instead of per-row loops"""
+
+    def __init__(self, courses_df, vocabulary=None):
+        # Ids are append-only, so a vocabulary can be shared with earlier engines and rebuilds
+        self.vocabulary = vocabulary if vocabulary is not None else SkillVocabulary()
+        self.domain_values, self.career_values = [], []
+        self.removed = np.empty(0, dtype=np.intp)  # Tombstoned catalog rows, sorted
+        self.n_courses = len(courses_df)
+        self._buffers = None  # Append buffers, created by the first extended() call
+        for name, values in zip(COURSE_ARRAYS, self._encode(courses_df)):
+            setattr(self, name, values)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffers'] = None  # Spare capacity is not worth persisting
+        return state
+
+    def _encode(self, courses_df):
+        """Per-course arrays for a block of catalog rows, growing the vocabularies as needed"""
+        skill_ids, skill_counts = [], []
+        for skills in courses_df['skills_covered'].tolist():
+            skill_ids.append(self.vocabulary.intern_all(skills))
+            skill_counts.append(max(len(skills), 1))  # Avoid division by zero
+
+        # Prerequisites keep duplicates: each missing entry counts towards the tier
+        prereq_ids = [[self.vocabulary.intern(normalize_skill(p)) for p in prereqs]
+                      for prereqs in courses_df['prerequisites'].tolist()]
+
+        level_codes = {level: i for i, level in enumerate(LEVELS)}
+        n_skills = len(self.vocabulary)  # One width for both matrices
+        return (
+            self._build_matrix(skill_ids, n_skills),
+            np.array(skill_counts, dtype=np.float64),
+            self._build_matrix(prereq_ids, n_skills),
+            np.array([len(p) for p in prereq_ids], dtype=np.int64),
+            np.array([level_codes.get(level, len(LEVELS)) for level in courses_df['level'].tolist()],
+                     dtype=np.intp),
+            self._factorize(courses_df['domain'], self.domain_values),
+            self._factorize(courses_df['career_path'], self.career_values)
+        )
+
+    def extended(self, courses_df):
+        """Copy of the engine with new courses appended; existing rows are not re-encoded"""
+        engine = copy.copy(self)
+        # The skill vocabulary is append-only and shared; older engines ignore ids past their width
+        engine.domain_values, engine.career_values = list(self.domain_values), list(self.career_values)
+        blocks = engine._encode(courses_df)
+
+        buffers = self._buffers or {
+            name: (CsrBuffer if name.endswith('_matrix') else ArrayBuffer)(getattr(self, name))
+            for name in COURSE_ARRAYS
+        }
+        engine._buffers = {}
+        for name, block in zip(COURSE_ARRAYS, blocks):
+            buffer = buffers[name].extend(self.n_courses, block)
+            engine._buffers[name] = buffer
+            setattr(engine, name, buffer.view())
+        engine.n_courses = self.n_courses + len(courses_df)
+        return engine
+
+    def without(self, rows):
+        """Copy of the engine with the given catalog rows tombstoned (they score -1)"""
+        engine = copy.copy(self)
+        engine.removed = np.union1d(self.removed, np.asarray(rows, dtype=np.intp))
+        return engine
+
+    @property
+    def n_skills(self):
+        """Width of this engine's incidence matrices"""
+        return self.skill_matrix.shape[1]
+
+    def _build_matrix(self, rows, n_skills):
+        """Build a course x skill CSR matrix; repeated ids in a row are summed"""
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        indices = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=indptr[-1])
+        data = np.ones(len(indices), dtype=np.int32)
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_skills))
+        matrix.sum_duplicates()
+        return matrix
+
+    @staticmethod
+    def _factorize(column, values):
+        """Encode a string column as codes into its unique lowercased values (extended in place)"""
+        lookup = {value: code for code, value in enumerate(values)}
+        codes = []
+        for value in column.tolist():
+            code = lookup.setdefault(value.lower(), len(lookup))
+            if code == len(values):
+                values.append(value.lower())
+            codes.append(code)
+        return np.array(codes, dtype=np.intp)
+
+    def _skill_ids(self, profile):
+        """Vocabulary columns of a UserProfile's skills (unknown skills are dropped)"""
+        n_skills = self.n_skills
+        return [c for c in profile.skill_ids(self.vocabulary) if c < n_skills]
+
+    def _skill_vector(self, profile):
+        """Indicator vector of the user's skills over the engine vocabulary"""
+        vector = np.zeros(self.n_skills, dtype=np.int32)
+        vector[self._skill_ids(profile)] = 1
+        return vector
+
+    def _skill_rows(self, profiles):
+        """Sparse users x skills indicator matrix for a list of UserProfiles"""
+        rows = [self._skill_ids(p) for p in profiles]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        indices = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=indptr[-1])
+        data = np.ones(len(indices), dtype=np.int32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), self.n_skills))
+
+    def overlap_counts(self, profiles, users, rows):
+        """Per (profile, course) pair: skills the user has, skills new to them, prerequisites missing
+
+        Pair i is ``profiles[users[i]]`` and catalog row ``rows[i]``; each count
+        comes from one sparse product over all pairs.
+        """
+        user_rows = self._skill_rows(profiles)[np.asarray(users, dtype=np.intp)]
+        rows = np.asarray(rows, dtype=np.intp)
+        skills = self.skill_matrix[rows]
+        matching = np.asarray(skills.multiply(user_rows).sum(axis=1)).ravel().astype(np.int64)
+        new = np.diff(skills.indptr) - matching  # Skill rows hold distinct skills
+        known_prereqs = np.asarray(self.prereq_matrix[rows].multiply(user_rows).sum(axis=1)).ravel()
+        return matching, new, self.prereq_counts[rows] - known_prereqs.astype(np.int64)
+
+    def _domain_hits(self, target_domain, indices=None):
+        """Boolean per course: target domain appears in its domain or career path"""
+        domain_codes, career_codes = self.domain_codes, self.career_codes
+        if indices is not None:
+            domain_codes, career_codes = domain_codes[indices], career_codes[indices]
+        if not target_domain:
+            return np.zeros(len(domain_codes), dtype=bool)
+        domain_hits = np.array([target_domain in d for d in self.domain_values], dtype=bool)
+        career_hits = np.array([target_domain in c for c in self.career_values], dtype=bool)
+        return domain_hits[domain_codes] | career_hits[career_codes]
+
+    def score(self, profile, indices=None):
+        """Integer match scores (0-100) per course for a UserProfile, identical to calculate_match_score
+
+        With ``indices`` only those catalog rows are scored, in the given order.
+        """
+        user_vector = self._skill_vector(profile)
+        skill_matrix, skill_counts = self.skill_matrix, self.skill_counts
+        prereq_matrix, prereq_counts = self.prereq_matrix, self.prereq_counts
+        level_codes = self.level_codes
+        if indices is not None:
+            skill_matrix, skill_counts = skill_matrix[indices], skill_counts[indices]
+            prereq_matrix, prereq_counts = prereq_matrix[indices], prereq_counts[indices]
+            level_codes = level_codes[indices]
+
+        # 1. Skill matching (40 points)
+        skill_matches = skill_matrix @ user_vector
+        score = skill_matches / skill_counts * 40
+
+        # 2. Level appropriateness (25 points)
+        score += LEVEL_TABLE[LEVELS.index(profile.level)][level_codes]
+
+        # 3. Prerequisite satisfaction (20 points)
+        missing_prereqs = prereq_counts - prereq_matrix @ user_vector
+        score += PREREQ_TIERS[np.minimum(missing_prereqs, 3)]
+
+        # 4. Career goal alignment (15 points)
+        score += np.where(self._domain_hits(profile.target_domain, indices), 15, 0)
+
+        score = np.minimum(100, score.astype(np.int64))
+        if indices is None:
+            score[self.removed] = -1
+        elif len(self.removed):
+            score[np.isin(indices, self.removed)] = -1
+        return score
+
+    def score_batch(self, profiles):
+        """Users x courses matrix of integer match scores, row i identical to score(profiles[i])"""
+        users = self._skill_rows(profiles)
+
+        # 1. Skill matching (40 points)
+        skill_matches = (self.skill_matrix @ users.T).T.toarray()
+        score = skill_matches / self.skill_counts * 40
+
+        # 2. Level appropriateness (25 points)
+        level_rows = np.array([LEVELS.index(p.level) for p in profiles], dtype=np.intp)
+        score += LEVEL_TABLE[level_rows[:, None], self.level_codes]
+
+        # 3. Prerequisite satisfaction (20 points)
+        missing_prereqs = self.prereq_counts - (self.prereq_matrix @ users.T).T.toarray()
+        score += PREREQ_TIERS[np.minimum(missing_prereqs, 3)]
+
+        # 4. Career goal alignment (15 points)
+        for row, profile in enumerate(profiles):
+            score[row] += np.where(self._domain_hits(profile.target_domain), 15, 0)
+
+        score = np.minimum(100, score.astype(np.int64))
+        score[:, self.removed] = -1
+        return score
+
+    def top_batch(self, profiles, top_n, n_jobs=None):
+        """Ranked (course indices, scores) per profile, scoring users in memory-bounded chunks"""
+        chunk_size = max(1, BATCH_CELLS // max(self.n_courses, 1))
+        chunks = [(start, start + chunk_size) for start in range(0, len(profiles), chunk_size)]
+
+        def run(bounds):
+            start, stop = bounds
+            scores = self.score_batch(profiles[start:stop])
+            return [(top, row[top]) for row, top in zip(scores, select_top(scores, top_n))]
+
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(chunks))
+        if n_jobs <= 1:
+            results = map(run, chunks)
+        else:
+            # NumPy/SciPy release the GIL inside the heavy kernels, so threads scale across cores
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(run, chunks))
+        return [ranked for chunk in results for ranked in chunk]
+
+
+def select_top(scores, top_n, threshold=MIN_MATCH_SCORE):
+    """Per-row indices of the top_n scores >= threshold, highest first and ties in catalog order"""
+    scores = np.atleast_2d(scores)
+    n_courses = scores.shape[1]
+    k = min(top_n, n_courses)
+    if k <= 0:
+        return [np.empty(0, dtype=np.intp) for _ in range(len(scores))]
+
+    # Fold the tie-break into one integer key so argpartition stays deterministic
+    keys = scores.astype(np.int64) * n_courses + (n_courses - 1 - np.arange(n_courses))
+    keys[scores < threshold] = -1
+    top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+    top_keys = np.take_along_axis(keys, top, axis=1)
+    order = np.argsort(-top_keys, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    qualifying = np.take_along_axis(top_keys, order, axis=1) >= 0
+    return [row[mask] for row, mask in zip(top, qualifying)]
+
+
+
+class RankCursor:
+    """Hands out the qualifying courses of one score row in rank order, a page at a time
+
+    Each page is partitioned out of the courses not yet handed out and only
+    that page is sorted, so showing a few pages never sorts the whole catalog.
+    Ranks match select_top: highest score first, ties in catalog order.
+    """
+
+    def __init__(self, scores, threshold=MIN_MATCH_SCORE, skip=0):
+        n_courses = len(scores)
+        self.scores = scores
+        self._rows = np.flatnonzero(scores >= threshold)
+        self._keys = scores[self._rows].astype(np.int64) * n_courses + (n_courses - 1 - self._rows)
+        if skip:
+            self.next(skip)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def next(self, count):
+        """(course rows, scores) of the next ``count`` ranks (fewer once the courses run out)"""
+        if count >= len(self._rows):
+            page, rest = np.arange(len(self._rows)), np.empty(0, dtype=np.intp)
+        elif count <= 0:
+            page, rest = np.empty(0, dtype=np.intp), np.arange(len(self._rows))
+        else:
+            split = np.argpartition(-self._keys, count - 1)
+            page, rest = split[:count], split[count:]
+        page = page[np.argsort(-self._keys[page], kind='stable')]
+        rows = self._rows[page]
+        self._rows, self._keys = self._rows[rest], self._keys[rest]
+        return rows, self.scores[rows]
\ No newline at end of file
@@ -0,0 +1,381 @@
+# service.py - Async HTTP Recommendation Service
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+import instrumentation
+from catalog_store import SCORING_COLUMNS, open_catalog_store
+from json_output import encode_payload, render_json_output
+from model_store import get_recommender
+from recommender import create_learning_path, generate_json_output
+
+MAX_BATCH = 64  # Most profiles coalesced into one batched scoring call
+MAX_WAIT = 0.005  # Seconds a request may wait for others to join its batch
+MAX_BODY = 1 << 20  # Largest accepted request body in bytes
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 100
+JSON_TYPE = 'application/json'
+METRICS_TYPE = 'text/plain; version=0.0.4'
+
+
+class HTTPError(Exception):
+    """Error returned to the client as a JSON {"error": ...} body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_profile(data):
+    """Validated user profile from a request body (same keys as sample_profiles)"""
+    if not isinstance(data, dict):
+        raise HTTPError(400, "'profile' must be an object")
+    skills = data.get('technical_skills', [])
+    if not isinstance(skills, list) or not all(isinstance(s, str) for s in skills):
+        raise HTTPError(400, "'technical_skills' must be a list of strings")
+    experience = data.get('experience_years', 0)
+    if isinstance(experience, bool) or not isinstance(experience, (int, float)):
+        raise HTTPError(400, "'experience_years' must be a number")
+    profile = dict(data)
+    profile['technical_skills'] = skills
+    profile['experience_years'] = experience
+    for key in ('target_domain', 'major', 'study_duration'):
+        if not isinstance(profile.get(key) or '', str):
+            raise HTTPError(400, f"'{key}' must be a string")
+        profile[key] = profile.get(key) or ''
+    return profile
+
+
+def parse_top_n(body):
+    """Validated top_n from a request body"""
+    top_n = body.get('top_n', DEFAULT_TOP_N)
+    if isinstance(top_n, bool) or not isinstance(top_n, int) or not 0 < top_n <= MAX_TOP_N:
+        raise HTTPError(400, f"'top_n' must be an integer between 1 and {MAX_TOP_N}")
+    return top_n
+
+
+class RecommendationBatcher:
+    """Coalesces concurrent recommendation requests into one batched scoring call
+
+    A request that arrives while no batch is being scored is flushed at
+    once, so an idle service adds no wait. Otherwise requests with the same
+    top_n that arrive within ``max_wait`` seconds of the first one are scored
+    together by generate_recommendations_batch on the worker pool; a lone
+    request takes the inverted-index path instead.
+    """
+
+    def __init__(self, recommender, executor, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.recommender = recommender
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = {}  # top_n -> [(profile, future)]
+        self._timers = {}  # top_n -> scheduled flush
+        self._in_flight = 0  # Batches submitted to the worker pool and not yet resolved
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0}
+
+    def submit(self, profile, top_n):
+        """Future resolving to (recommendations for one profile, Trace of the batch that scored it)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(top_n, [])
+        pending.append((profile, future))
+        self.stats['requests'] += 1
+        if len(pending) >= self.max_batch or (len(pending) == 1 and not self._in_flight):
+            self._flush(top_n)
+        elif len(pending) == 1:
+            self._timers[top_n] = loop.call_later(self.max_wait, self._flush, top_n)
+        return future
+
+    def _flush(self, top_n):
+        timer = self._timers.pop(top_n, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(top_n, [])
+        if not batch:
+            return
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+        profiles = [profile for profile, _ in batch]
+        self._in_flight += 1
+        work = asyncio.get_running_loop().run_in_executor(self.executor, self._score, profiles, top_n)
+        work.add_done_callback(partial(self._resolve, batch))
+
+    def _score(self, profiles, top_n):
+        """Runs on a worker thread; returns the results and the batch's Trace"""
+        with instrumentation.trace('batch') as batch_trace:
+            if len(profiles) == 1:
+                results = [self.recommender.generate_recommendations(profiles[0], top_n)]
+            else:
+                results = self.recommender.generate_recommendations_batch(profiles, top_n)
+        batch_trace.counters['batch_size'] = len(profiles)
+        return results, batch_trace
+
+    def _resolve(self, batch, work):
+        self._in_flight -= 1
+        for i, (_, future) in enumerate(batch):
+            if future.cancelled():  # The client went away
+                continue
+            if work.exception() is not None:
+                future.set_exception(work.exception())
+            else:
+                results, batch_trace = work.result()
+                future.set_result((results[i], batch_trace))
+
+
+class RecommendationService:
+    """HTTP endpoints over one shared, preloaded CareerRecommender
+
+    Routes (request and response bodies are JSON):
+      GET  /health           catalog size and version
+      GET  /stats            batching and result cache counters
+      GET  /metrics          Prometheus text, when built with a HistogramSink
+      POST /recommendations  {"profile": {...}, "top_n": 10} -> {"recommendations": [...]}
+      POST /learning-path    {"profile": ...} -> planned path, or {"recommendations": [...]} -> bucketed
+      POST /json-output      {"profile": ...} or {"recommendations": [...]} -> generate_json_output
+
+    With the default 'json' encoder /json-output is assembled from the
+    recommender's pre-encoded course fragments; 'orjson' encodes every
+    response with orjson instead.
+    """
+
+    def __init__(self, recommender, workers=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT, metrics=None,
+                 encoder='json'):
+        self.recommender = recommender
+        self.metrics = metrics  # instrumentation.HistogramSink exposed on /metrics
+        self.encoder = encoder
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+        self.batcher = RecommendationBatcher(recommender, self.executor, max_batch, max_wait)
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/stats'): self.stats,
+            ('POST', '/recommendations'): self.recommendations,
+            ('POST', '/learning-path'): self.learning_path,
+            ('POST', '/json-output'): self.json_output
+        }
+        if metrics is not None:
+            self.routes[('GET', '/metrics')] = self.prometheus
+        self._server = None
+
+    async def health(self, body):
+        return {'status': 'ok', 'courses': self.recommender.scoring_engine.n_courses,
+                'catalog_version': self.recommender.catalog_version}
+
+    async def stats(self, body):
+        return {'batching': dict(self.batcher.stats), 'result_cache': self.recommender.result_cache.stats()}
+
+    async def prometheus(self, body):
+        return instrumentation.prometheus_text(self.metrics)  # Text, not JSON
+
+    async def _recommend(self, body):
+        recommendations, batch_trace = await self.batcher.submit(parse_profile(body.get('profile')), parse_top_n(body))
+        instrumentation.absorb(batch_trace)
+        return recommendations
+
+    async def _recommendations_or_profile(self, body):
+        """Recommendations given in the body, or generated for its profile"""
+        if 'recommendations' in body:
+            recommendations = body['recommendations']
+            if not isinstance(recommendations, list) or not all(isinstance(r, dict) for r in recommendations):
+                raise HTTPError(400, "'recommendations' must be a list of objects")
+            return recommendations
+        return await self._recommend(body)
+
+    async def recommendations(self, body):
+        return {'recommendations': await self._recommend(body)}
+
+    def _plan(self, profile):
+        """Runs on a worker thread; returns the planned learning path and its Trace"""
+        with instrumentation.trace('plan') as plan_trace:
+            learning_path = self.recommender.plan_learning_path(profile)
+        return learning_path, plan_trace
+
+    async def learning_path(self, body):
+        if 'recommendations' not in body:
+            # Profiles get a prerequisite-aware plan sized to their study_duration
+            profile = parse_profile(body.get('profile'))
+            work = asyncio.get_running_loop().run_in_executor(self.executor, self._plan, profile)
+            learning_path, plan_trace = await work
+            instrumentation.absorb(plan_trace)
+            return learning_path
+        try:
+            return create_learning_path(await self._recommendations_or_profile(body))
+        except KeyError as e:
+            raise HTTPError(400, f"recommendation is missing {e}")
+
+    async def json_output(self, body):
+        recommendations = await self._recommendations_or_profile(body)
+        try:
+            learning_path = create_learning_path(recommendations)
+            if self.encoder == 'json':
+                with instrumentation.stage('serialize'):
+                    return render_json_output(recommendations, learning_path,
+                                              fragments=self.recommender.json_fragments)
+            return generate_json_output(recommendations, learning_path)
+        except KeyError as e:
+            raise HTTPError(400, f"recommendation is missing {e}")
+
+    async def dispatch(self, method, target, body=b''):
+        """(status, response bytes, content type) for one request; shared by the HTTP server and InProcessClient"""
+        try:
+            path = urlsplit(target).path.rstrip('/') or '/'
+            handler = self.routes.get((method, path))
+            if handler is None:
+                if any(route_path == path for _, route_path in self.routes):
+                    raise HTTPError(405, f"{method} not allowed on {path}")
+                raise HTTPError(404, f"no route for {path}")
+            data = {}
+            if method == 'POST':
+                try:
+                    data = json.loads(body or b'{}')
+                except ValueError:
+                    raise HTTPError(400, "body is not valid JSON")
+                if not isinstance(data, dict):
+                    raise HTTPError(400, "body must be a JSON object")
+            with instrumentation.trace(path):
+                result = await handler(data)
+                if isinstance(result, str):
+                    return 200, result.encode('utf-8'), METRICS_TYPE
+                if isinstance(result, bytes):
+                    return 200, result, JSON_TYPE  # Already rendered
+                with instrumentation.stage('serialize'):
+                    return 200, encode_payload(result, self.encoder), JSON_TYPE
+        except HTTPError as e:
+            return e.status, encode_payload({'error': e.message}), JSON_TYPE
+        except Exception as e:
+            return 500, encode_payload({'error': f"{type(e).__name__}: {e}"}), JSON_TYPE
+
+    async def _handle_connection(self, reader, writer):
+        """HTTP/1.1 with keep-alive; one request at a time per connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._write(writer, 400, encode_payload({'error': "malformed request line"}), False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    await self._write(writer, 413 if length > MAX_BODY else 400,
+                                      encode_payload({'error': "bad or oversized Content-Length"}), False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload, content_type = await self.dispatch(method.upper(), target, body)
+                await self._write(writer, status, payload, keep_alive, content_type)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, status, payload, keep_alive, content_type=JSON_TYPE):
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Start listening; returns the asyncio server (port=0 picks a free port)"""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.executor.shutdown(wait=True)
+
+
+class InProcessClient:
+    """Calls a RecommendationService directly, without sockets (for local tests and scripts)"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def request(self, method, path, data=None):
+        """(status, decoded JSON body, or text for /metrics)"""
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        status, payload, content_type = await self.service.dispatch(method, path, body)
+        return status, json.loads(payload) if content_type == JSON_TYPE else payload.decode('utf-8')
+
+    async def get(self, path):
+        return await self.request('GET', path)
+
+    async def post(self, path, data):
+        return await self.request('POST', path, data)
+
+
+def preload_recommender():
+    """Shared fitted recommender for the catalog named by SMARTCAREER_CATALOG (as in app.py)"""
+    catalog_store = open_catalog_store(os.environ.get('SMARTCAREER_CATALOG', 'memory'))
+    with instrumentation.stage('load_catalog'):
+        courses_df = catalog_store.load(SCORING_COLUMNS)
+    return get_recommender(courses_df, catalog_store=catalog_store)
+
+
+async def serve(host, port, workers=None, shards=None, metrics=False, log_traces=False, encoder='json'):
+    sinks = [instrumentation.HistogramSink()] if metrics else []
+    if log_traces:
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        sinks.append(instrumentation.LogSink())
+    instrumentation.enable(*sinks)
+
+    recommender = preload_recommender()
+    recommender.n_shards = shards
+    service = RecommendationService(recommender, workers=workers, metrics=sinks[0] if metrics else None,
+                                    encoder=encoder)
+    server = await service.start(host, port)
+    print(f"✅ Serving recommendations on http://{host}:{server.sockets[0].getsockname()[1]}")
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+        recommender.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SmartCareer recommendation HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help="scoring threads (default: CPU-based)")
+    parser.add_argument('--shards', type=int, default=None,
+                        help="score large catalogs in this many shards on a process pool")
+    parser.add_argument('--metrics', action='store_true', help="record stage timings and serve GET /metrics")
+    parser.add_argument('--log-traces', action='store_true', help="log one JSON line of stage timings per request")
+    parser.add_argument('--encoder', choices=['json', 'orjson'], default='json',
+                        help="response encoder; orjson is faster but emits UTF-8 instead of \\u escapes")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.shards, args.metrics, args.log_traces,
+                          args.encoder))
+    except KeyboardInterrupt:
+        pass
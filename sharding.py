@@ -0,0 +1,199 @@
+# sharding.py - Multi-Process Sharded Scoring over Shared Memory
+import os
+import threading
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy import sparse
+
+from scoring import ScoringEngine, select_top
+
+# Catalogs smaller than this are scored in-process: IPC would cost more than it saves
+SHARD_MIN_COURSES = 500_000
+
+# Engine arrays copied into shared memory, with the dtype workers see them as
+SHARED_ARRAYS = {
+    'skill_indptr': np.int32, 'skill_indices': np.int32, 'skill_data': np.int32,
+    'prereq_indptr': np.int32, 'prereq_indices': np.int32, 'prereq_data': np.int32,
+    'skill_counts': np.float64, 'prereq_counts': np.int64, 'level_codes': np.intp,
+    'domain_codes': np.intp, 'career_codes': np.intp, 'removed': np.intp
+}
+ALIGNMENT = 64
+
+
+class EncodedProfile:
+    """The parts of a UserProfile a shard needs, with skills already mapped to vocabulary ids"""
+
+    __slots__ = ('ids', 'level', 'target_domain')
+
+    def __init__(self, ids, level, target_domain):
+        self.ids = ids
+        self.level = level
+        self.target_domain = target_domain
+
+    def __getstate__(self):
+        return (self.ids, self.level, self.target_domain)
+
+    def __setstate__(self, state):
+        self.ids, self.level, self.target_domain = state
+
+    def skill_ids(self, vocabulary):
+        return self.ids
+
+
+def _engine_arrays(engine):
+    skill, prereq = engine.skill_matrix, engine.prereq_matrix
+    return {
+        'skill_indptr': skill.indptr, 'skill_indices': skill.indices, 'skill_data': skill.data,
+        'prereq_indptr': prereq.indptr, 'prereq_indices': prereq.indices, 'prereq_data': prereq.data,
+        'skill_counts': engine.skill_counts, 'prereq_counts': engine.prereq_counts,
+        'level_codes': engine.level_codes, 'domain_codes': engine.domain_codes,
+        'career_codes': engine.career_codes, 'removed': engine.removed
+    }
+
+
+class CatalogExport:
+    """One engine's arrays packed into a single shared-memory block, plus the spec workers attach with"""
+
+    def __init__(self, engine, n_shards):
+        arrays = {name: np.ascontiguousarray(values, dtype=SHARED_ARRAYS[name])
+                  for name, values in _engine_arrays(engine).items()}
+        layout, size = {}, 0
+        for name, values in arrays.items():
+            layout[name] = (size, len(values))
+            size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, values in arrays.items():
+            offset, length = layout[name]
+            np.ndarray(length, dtype=SHARED_ARRAYS[name], buffer=self.memory.buf, offset=offset)[:] = values
+
+        bounds = np.linspace(0, engine.n_courses, min(n_shards, max(engine.n_courses, 1)) + 1).astype(int)
+        self.spec = {
+            'token': uuid.uuid4().hex,
+            'memory': self.memory.name,
+            'layout': layout,
+            'shards': list(zip(bounds[:-1].tolist(), bounds[1:].tolist())),
+            'n_skills': engine.n_skills,
+            'domain_values': list(engine.domain_values),
+            'career_values': list(engine.career_values)
+        }
+
+    def release(self):
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# Worker side: attached exports by token (only the most recent few stay mapped)
+_attached = {}
+WORKER_EXPORTS = 2
+
+
+def _shard_engine(arrays, spec, start, stop):
+    """ScoringEngine over rows [start, stop) of the shared arrays (views, no copies of the big buffers)"""
+    engine = ScoringEngine.__new__(ScoringEngine)
+    engine.vocabulary = None  # Profiles arrive as EncodedProfile
+    shape = (stop - start, spec['n_skills'])
+    for name in ('skill', 'prereq'):
+        indptr = arrays[f'{name}_indptr'][start:stop + 1]
+        lo, hi = int(indptr[0]), int(indptr[-1])
+        matrix = sparse.csr_matrix(
+            (arrays[f'{name}_data'][lo:hi], arrays[f'{name}_indices'][lo:hi], (indptr - lo).astype(np.int32)),
+            shape=shape, copy=False
+        )
+        setattr(engine, f'{name}_matrix', matrix)
+    for name in ('skill_counts', 'prereq_counts', 'level_codes', 'domain_codes', 'career_codes'):
+        setattr(engine, name, arrays[name][start:stop])
+    removed = arrays['removed']
+    engine.removed = removed[(removed >= start) & (removed < stop)] - start
+    engine.domain_values, engine.career_values = spec['domain_values'], spec['career_values']
+    engine.n_courses = stop - start
+    engine._buffers = None
+    return engine
+
+
+def _attach(spec):
+    attached = _attached.get(spec['token'])
+    if attached is None:
+        memory = shared_memory.SharedMemory(name=spec['memory'])
+        arrays = {name: np.ndarray(length, dtype=SHARED_ARRAYS[name], buffer=memory.buf, offset=offset)
+                  for name, (offset, length) in spec['layout'].items()}
+        engines = [_shard_engine(arrays, spec, start, stop) for start, stop in spec['shards']]
+        attached = _attached[spec['token']] = (memory, engines)
+        while len(_attached) > WORKER_EXPORTS:
+            old_memory, old_engines = _attached.pop(next(iter(_attached)))
+            del old_engines
+            try:
+                old_memory.close()
+            except BufferError:
+                pass  # A view is still alive; the mapping closes when it is collected
+    return attached[1]
+
+
+def _score_shard(spec, shard, profiles, top_n):
+    """Worker task: per-profile (global rows, scores) of one shard's top_n"""
+    engine = _attach(spec)[shard]
+    start = spec['shards'][shard][0]
+    return [(rows + start, scores) for rows, scores in engine.top_batch(profiles, top_n, n_jobs=1)]
+
+
+def merge_top(parts, top_n):
+    """Global top_n from per-shard (rows, scores), with select_top's ranking and tie-breaking"""
+    rows = np.concatenate([part[0] for part in parts])
+    scores = np.concatenate([part[1] for part in parts])
+    order = np.argsort(rows, kind='stable')
+    rows, scores = rows[order], scores[order]
+    best = select_top(scores, top_n)[0]
+    return rows[best], scores[best]
+
+
+def _release(exports, executor):
+    executor.shutdown(wait=False, cancel_futures=True)
+    for _, export in exports.values():
+        export.release()
+    exports.clear()
+
+
+class ShardedScorer:
+    """Scores catalog shards held in shared memory on a persistent process pool
+
+    Each engine version is exported once (the first time it is scored) and
+    workers map it zero-copy. The two most recent exports are kept so requests
+    still running on an older catalog version can finish.
+    """
+
+    def __init__(self, n_shards=None, processes=None):
+        self.n_shards = n_shards or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=processes or min(self.n_shards, os.cpu_count() or 1))
+        self._exports = {}  # id(engine) -> (engine, CatalogExport), oldest first
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _release, self._exports, self.executor)
+
+    def _export(self, engine):
+        with self._lock:
+            entry = self._exports.get(id(engine))
+            if entry is None or entry[0] is not engine:
+                if entry is not None:
+                    self._exports.pop(id(engine))[1].release()  # The id of a collected engine was reused
+                entry = self._exports[id(engine)] = (engine, CatalogExport(engine, self.n_shards))
+                while len(self._exports) > 2:
+                    self._exports.pop(next(iter(self._exports)))[1].release()
+            return entry[1].spec
+
+    def top_batch(self, engine, profiles, top_n):
+        """Ranked (rows, scores) per UserProfile, identical to engine.top_batch"""
+        spec = self._export(engine)
+        encoded = [EncodedProfile(engine._skill_ids(p), p.level, p.target_domain) for p in profiles]
+        futures = [self.executor.submit(_score_shard, spec, shard, encoded, top_n)
+                   for shard in range(len(spec['shards']))]
+        parts = [future.result() for future in futures]
+        return [merge_top([part[i] for part in parts], top_n) for i in range(len(profiles))]
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        self._finalizer()
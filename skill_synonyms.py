@@ -0,0 +1,99 @@
+# skill_synonyms.py - Skill Aliases, Spelling Keys and One-Edit Fuzzy Matching
+import re
+
+# Canonical skill (as the catalog spells it) -> other names users and providers write for it.
+# Spellings that only differ in case, spaces or punctuation ('nodejs', 'Node JS') need no entry.
+SKILL_SYNONYMS = {
+    'ai': ['artificial intelligence'],
+    'aws': ['amazon web services'],
+    'bash': ['shell scripting', 'shell'],
+    'business intelligence': ['bi'],
+    'c#': ['c sharp'],
+    'c++': ['cpp'],
+    'cloud computing': ['cloud'],
+    'containers': ['containerization'],
+    'css': ['css3'],
+    'cybersecurity': ['information security', 'infosec'],
+    'data visualization': ['data viz'],
+    'deep learning': ['dl'],
+    'excel': ['microsoft excel', 'ms excel'],
+    'express': ['express.js'],
+    'go': ['golang'],
+    'html': ['html5'],
+    'illustrator': ['adobe illustrator'],
+    'javascript': ['js', 'ecmascript', 'es6'],
+    'kubernetes': ['k8s'],
+    'machine learning': ['ml'],
+    'mathematics': ['math', 'maths'],
+    'mongodb': ['mongo'],
+    'node.js': ['node'],
+    'oop': ['object-oriented programming'],
+    'photoshop': ['adobe photoshop'],
+    'postgresql': ['postgres'],
+    'python': ['python3'],
+    'react': ['react.js'],
+    'seo': ['search engine optimization'],
+    'sql': ['structured query language'],
+    'statistics': ['stats'],
+    'system administration': ['sysadmin', 'systems administration'],
+    'typescript': ['ts'],
+    'ui design': ['user interface design'],
+    'user research': ['ux research']
+}
+
+FUZZY_MIN_LENGTH = 5  # Shorter spellings (sql, aws, seo) are too close to each other to correct
+
+_SEPARATORS = re.compile(r"[\s._\-/]+")
+
+
+def fold_skill(skill):
+    """Spelling key: lowercase without spaces, dots, dashes, underscores or slashes ('Node.JS' -> 'nodejs')
+
+    '+' and '#' are kept, so c, c++ and c# stay apart.
+    """
+    return _SEPARATORS.sub('', skill.lower())
+
+
+def compile_aliases(synonyms):
+    """{spelling key: canonical skill} for every canonical skill and alias"""
+    aliases = {}
+    for canonical, names in synonyms.items():
+        for name in [canonical] + list(names):
+            key = fold_skill(name)
+            if aliases.setdefault(key, canonical) != canonical:
+                raise ValueError(f"{name!r} is an alias of both {aliases[key]!r} and {canonical!r}")
+    return aliases
+
+
+SKILL_ALIASES = compile_aliases(SKILL_SYNONYMS)
+
+
+def deletions(key):
+    """Every spelling of key with one character removed"""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent transposition"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2]
+                                      and a[i + 2:] == b[i + 2:])
+
+
+def fuzzy_candidate(key, min_length=FUZZY_MIN_LENGTH):
+    """True if a spelling key may take part in one-edit corrections
+
+    Keys with digits are left alone: 'skill 12' and 'skill 13', or 'python2'
+    and 'python3', are different skills rather than typos.
+    """
+    return len(key) >= min_length and not any(c.isdigit() for c in key)
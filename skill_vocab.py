@@ -0,0 +1,163 @@
+# skill_vocab.py - Shared Skill Vocabulary (interned ids + bitsets)
+import functools
+import threading
+from array import array
+
+from skill_synonyms import FUZZY_MIN_LENGTH, SKILL_ALIASES, deletions, fold_skill, fuzzy_candidate, within_one_edit
+
+RESOLVED_MEMO = 1 << 16  # Most unmatched user spellings whose fuzzy resolution is remembered
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_skill(skill):
+    """Canonical form of a free-text skill: lowercase, single-spaced, aliases resolved ('ML' -> 'machine learning')"""
+    skill = ' '.join(skill.lower().split())
+    return SKILL_ALIASES.get(fold_skill(skill), skill)
+
+
+def parse_skills(text):
+    """Normalized skills from comma-separated user input"""
+    return [normalize_skill(skill) for skill in text.split(',') if skill.strip()]
+
+
+def has_skill(bits, skill_id):
+    """True if skill_id is set in a bitset (unknown ids are never set)"""
+    return skill_id >= 0 and (bits >> skill_id) & 1 == 1
+
+
+def count_in(skill_ids, bits):
+    """How many of skill_ids are set in a bitset"""
+    return sum((bits >> i) & 1 for i in skill_ids)
+
+
+class SkillVocabulary:
+    """Append-only mapping between skill keys and compact integer ids
+
+    Keys are stored as first given; callers normalize them first
+    (``normalize_skill`` for skills). Keys with the same spelling key
+    (``fold_skill``: 'node.js', 'nodejs') share one id. Ids never change
+    once assigned, so arrays built from older snapshots of the vocabulary
+    stay valid.
+
+    Catalog skills are interned at ingest. User skills are only looked up:
+    a skill no course mentions cannot overlap any course, and interning
+    free-text input would grow the vocabulary without bound. A user skill
+    that matches no spelling key is corrected to the catalog skill one edit
+    away, if any; the deletion index behind that is built on the first such
+    miss and each spelling is resolved once, so repeated requests cost the
+    same dict lookups as exact matches.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._folded = {}  # Spelling key -> id
+        self._fuzzy = None  # Spelling key and its one-deletion variants -> id, built on the first miss
+        self._resolved = {}  # User spelling key -> id (-1 if none), for misses of _ids
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'_names': self._names}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for key in state['_names']:
+            self.intern(key)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def intern(self, key):
+        """Id for a key, assigning the next free one if neither it nor its spelling key is known"""
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            with self._lock:
+                skill_id = self._ids.get(key)
+                if skill_id is None:
+                    folded = fold_skill(key)
+                    skill_id = self._folded.get(folded)
+                    if skill_id is None:
+                        # Name first, so a published id always resolves
+                        skill_id = len(self._names)
+                        self._names.append(key)
+                        self._folded[folded] = skill_id
+                        if self._fuzzy is not None:
+                            self._index_fuzzy(self._fuzzy, folded, skill_id)
+                        self._resolved = {}  # Earlier misses may now resolve
+                    self._ids[key] = skill_id
+        return skill_id
+
+    def get(self, key, default=-1):
+        """Id for a key or its spelling key, or default if it was never interned"""
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            return self._folded.get(fold_skill(key), default)
+        return skill_id
+
+    @staticmethod
+    def _index_fuzzy(index, folded, skill_id):
+        # A query of FUZZY_MIN_LENGTH may be one insertion away from a shorter catalog skill
+        if fuzzy_candidate(folded, FUZZY_MIN_LENGTH - 1):
+            index.setdefault(folded, skill_id)
+            for variant in deletions(folded):
+                index.setdefault(variant, skill_id)
+
+    def resolve(self, key):
+        """Id for a normalized user skill: exact, by spelling key, else one edit from a catalog skill; -1 if none"""
+        skill_id = self._ids.get(key)
+        if skill_id is not None:
+            return skill_id
+        folded = fold_skill(key)
+        skill_id = self._folded.get(folded)
+        if skill_id is not None:
+            return skill_id
+        resolved = self._resolved
+        skill_id = resolved.get(folded)
+        if skill_id is None:
+            skill_id = self._correct(folded) if fuzzy_candidate(folded) else -1
+            if len(resolved) >= RESOLVED_MEMO:
+                resolved.clear()
+            resolved[folded] = skill_id
+        return skill_id
+
+    def _correct(self, folded):
+        """Lowest id whose spelling key is one edit from ``folded``, or -1"""
+        index = self._fuzzy
+        if index is None:
+            with self._lock:
+                if self._fuzzy is None:
+                    index = {}
+                    for folded_name, skill_id in self._folded.items():
+                        self._index_fuzzy(index, folded_name, skill_id)
+                    self._fuzzy = index
+                index = self._fuzzy
+        candidates = {index.get(variant) for variant in deletions(folded)}
+        candidates.add(index.get(folded))
+        candidates.discard(None)
+        matches = [skill_id for skill_id in candidates
+                   if within_one_edit(folded, fold_skill(self._names[skill_id]))]
+        return min(matches) if matches else -1
+
+    def intern_all(self, skills):
+        """Sorted unique ids of skills (normalized and interned) as array('I')"""
+        return array('I', sorted({self.intern(normalize_skill(s)) for s in skills}))
+
+    def encode(self, skills):
+        """Sorted unique ids of the known skills among ``skills`` as array('I')"""
+        ids = {self.resolve(normalize_skill(s)) for s in skills}
+        ids.discard(-1)
+        return array('I', sorted(ids))
+
+    def bits(self, skills):
+        """Bitset (a Python int) of the known skills among ``skills``"""
+        bits = 0
+        for skill_id in self.encode(skills):
+            bits |= 1 << skill_id
+        return bits
+
+    def names(self, skill_ids):
+        """Skill keys for ids"""
+        return [self._names[i] for i in skill_ids]
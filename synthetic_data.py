@@ -0,0 +1,102 @@
+# synthetic_data.py - Seeded Synthetic Catalogs & Profiles for Benchmarks
+import numpy as np
+import pandas as pd
+
+from course_data import get_course_records
+from sample_profiles import get_sample_profiles
+
+ZIPF_EXPONENT = 1.07  # Skill popularity falls off like 1 / rank^s
+LEVEL_WEIGHTS = {'beginner': 0.4, 'intermediate': 0.45, 'advanced': 0.15}
+PROVIDERS = ['Coursera', 'Udemy', 'edX', 'freeCodeCamp', 'Skillshare', 'LinkedIn Learning', 'Google', 'AWS']
+COSTS = ['Free', '$39', '$49', '$79', '$89', '$99', '$149', '$199']
+EDUCATION = ['High School', 'Associate Degree', 'Bachelors Degree', 'Masters Degree', 'PhD']
+MAJORS = ['Computer Science', 'Business Administration', 'Marketing', 'Mechanical Engineering',
+          'Mathematics', 'Design', 'Finance', '']
+
+
+def default_skill_count(n_courses):
+    """Vocabulary size for a catalog: grows with the square root of its size"""
+    return int(min(100_000, max(200, 20 * n_courses ** 0.5)))
+
+
+def skill_pool(n_skills):
+    """Skill names by popularity rank: the real catalog's skills first, then a synthetic long tail"""
+    counts = {}
+    for record in get_course_records():
+        for skill in record['skills_covered'] + record['prerequisites']:
+            counts[skill] = counts.get(skill, 0) + 1
+    names = sorted(counts, key=lambda s: (-counts[s], s))[:n_skills]
+    names += [f"skill {i}" for i in range(n_skills - len(names))]
+    return np.array(names, dtype=object)
+
+
+def zipf_cdf(n_items, exponent=ZIPF_EXPONENT):
+    weights = 1.0 / np.arange(1, n_items + 1) ** exponent
+    return np.cumsum(weights) / weights.sum()
+
+
+def _draw_lists(rng, names, cdf, counts):
+    """One list per count of distinct skills drawn by popularity (duplicates dropped)"""
+    codes = np.minimum(np.searchsorted(cdf, rng.random(int(counts.sum())), side='right'), len(names) - 1)
+    drawn = names[codes].tolist()
+    offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    return [list(dict.fromkeys(drawn[start:stop])) for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def generate_catalog(n_courses, seed=0, n_skills=None):
+    """DataFrame shaped like course_data.get_course_catalog() with skewed skill frequencies"""
+    rng = np.random.default_rng(seed)
+    names = skill_pool(n_skills or default_skill_count(n_courses))
+    cdf = zipf_cdf(len(names))
+    templates = get_course_records()
+
+    # Domain and career path come in the pairs the real catalog uses
+    template_rows = rng.integers(0, len(templates), n_courses)
+    levels = rng.choice(list(LEVEL_WEIGHTS), n_courses, p=list(LEVEL_WEIGHTS.values()))
+    skills = _draw_lists(rng, names, cdf, rng.integers(2, 8, n_courses))
+    prerequisites = _draw_lists(rng, names, cdf, rng.choice(4, n_courses, p=[0.5, 0.25, 0.15, 0.1]))
+
+    return pd.DataFrame({
+        'id': np.arange(1, n_courses + 1).tolist(),
+        'title': [f"{s[0].title()} for {t['career_path']}s ({level.title()})"
+                  for s, t, level in zip(skills, (templates[i] for i in template_rows.tolist()), levels)],
+        'provider': rng.choice(PROVIDERS, n_courses).tolist(),
+        'duration': [f"{weeks} weeks" for weeks in rng.integers(2, 17, n_courses).tolist()],
+        'level': levels.tolist(),
+        'cost': rng.choice(COSTS, n_courses).tolist(),
+        'prerequisites': prerequisites,
+        'skills_covered': skills,
+        'career_path': [templates[i]['career_path'] for i in template_rows.tolist()],
+        'link': '#',
+        'domain': [templates[i]['domain'] for i in template_rows.tolist()]
+    })
+
+
+def generate_profiles(n_profiles, seed=1, n_skills=None, n_courses=None):
+    """User profiles shaped like sample_profiles.get_sample_profiles()
+
+    Users mostly know popular skills, drawn from the same distribution as the
+    catalog of ``n_courses`` so their skills overlap it realistically.
+    """
+    rng = np.random.default_rng(seed)
+    names = skill_pool(n_skills or default_skill_count(n_courses or 1000))
+    cdf = zipf_cdf(len(names))
+    domains = sorted({record['domain'] for record in get_course_records()})
+    soft_skills = sorted({s for profile in get_sample_profiles() for s in profile['soft_skills']})
+
+    technical = _draw_lists(rng, names, cdf, rng.integers(1, 11, n_profiles))
+    targets = rng.choice(domains + [''], n_profiles, p=[0.9 / len(domains)] * len(domains) + [0.1])
+    experience = np.minimum(rng.geometric(0.3, n_profiles) - 1, 20)
+    profiles = []
+    for i in range(n_profiles):
+        profiles.append({
+            'name': f"Synthetic User {i + 1}",
+            'education': EDUCATION[rng.integers(len(EDUCATION))],
+            'major': MAJORS[rng.integers(len(MAJORS))],
+            'technical_skills': technical[i],
+            'soft_skills': rng.choice(soft_skills, 3, replace=False).tolist(),
+            'target_domain': str(targets[i]),
+            'experience_years': int(experience[i]),
+            'goals': ''
+        })
+    return profiles
@@ -0,0 +1,5 @@
+# conftest.py - Test Setup: Make the Top-Level Modules Importable
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
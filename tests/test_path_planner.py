@@ -0,0 +1,38 @@
+# test_path_planner.py - Learning-Path Planner Tests
+from catalog_store import SCORING_COLUMNS, open_catalog_store
+from course_data import get_course_catalog
+from path_planner import parse_weeks
+from recommender import CareerRecommender
+from sample_profiles import get_sample_profiles
+
+
+def in_domain(course, target_domain):
+    """Target domain names the course's domain or career path, or is a specialization of its domain"""
+    target = target_domain.lower()
+    domain, career = course['domain'].lower(), course['career_path'].lower()
+    return target in domain or target in career or domain in target
+
+
+def test_sample_profiles_plan_target_domain_goals():
+    courses = get_course_catalog()
+    by_id = {course['id']: course for course in courses.to_dict('records')}
+    recommender = CareerRecommender(courses)
+    for profile in get_sample_profiles():
+        path = recommender.plan_learning_path(profile)['path']
+        goals = [step for step in path if step['purpose'] == 'goal']
+        assert goals, profile['name']
+        for step in goals:
+            assert in_domain(by_id[step['course_id']], profile['target_domain']), (profile['name'], step)
+
+
+def test_pruned_catalog_plans_with_course_durations():
+    """The app and service load only SCORING_COLUMNS; step weeks must still come from each course's duration"""
+    store = open_catalog_store('memory')
+    catalog = store.load()
+    durations = dict(zip(catalog['id'], catalog['duration']))
+    recommender = CareerRecommender(store.load(SCORING_COLUMNS), catalog_store=store)
+    for profile in get_sample_profiles():
+        learning_path = recommender.plan_learning_path(profile)
+        for step in learning_path['path']:
+            assert step['end_week'] - step['start_week'] == parse_weeks(durations[step['course_id']]), step
+        assert learning_path['total_weeks'] <= learning_path['budget_weeks']
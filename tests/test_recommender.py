@@ -0,0 +1,17 @@
+# test_recommender.py - Career Recommender Tests
+from recommender import CareerRecommender
+from sample_profiles import get_sample_profiles
+from synthetic_data import generate_catalog
+
+
+def test_batch_reuses_single_request_cache_entry():
+    """A profile answered by generate_recommendations is a cache hit for generate_recommendations_batch"""
+    recommender = CareerRecommender(generate_catalog(500, seed=1))
+    profile = get_sample_profiles()[0]
+    single = recommender.generate_recommendations(profile, top_n=5)
+    before = recommender.result_cache.stats()
+    batch = recommender.generate_recommendations_batch([profile], top_n=5)
+    after = recommender.result_cache.stats()
+    assert batch == [single]
+    assert after['hits'] == before['hits'] + 1
+    assert after['misses'] == before['misses']
@@ -0,0 +1,30 @@
+# test_service.py - Recommendation Service Tests
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from recommender import CareerRecommender
+from sample_profiles import get_sample_profiles
+from service import RecommendationBatcher
+from synthetic_data import generate_catalog
+from user_profile import UserProfile
+
+
+def test_batcher_skips_requests_cancelled_mid_batch():
+    """A client that disconnects while its batch is scored leaves the other requests' results intact"""
+    recommender = CareerRecommender(generate_catalog(500, seed=1))
+    profiles = [UserProfile.of(p) for p in get_sample_profiles()[:3]]
+    errors = []
+
+    async def run(executor):
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        batcher = RecommendationBatcher(recommender, executor, max_wait=0.01)
+        first = batcher.submit(profiles[0], 5)  # Flushed at once
+        second, third = batcher.submit(profiles[1], 5), batcher.submit(profiles[2], 5)
+        second.cancel()
+        await first
+        return await asyncio.wait_for(third, 10)
+
+    with ThreadPoolExecutor(1) as executor:
+        recommendations, _ = asyncio.run(run(executor))
+    assert errors == []
+    assert recommendations == recommender.generate_recommendations(profiles[2], 5)
@@ -0,0 +1,78 @@
+# text_features.py - TF-IDF Features without a Runtime scikit-learn Dependency
+import re
+
+import numpy as np
+from scipy import sparse
+
+TFIDF_PARAMS = {'stop_words': 'english', 'max_features': 1000}
+
+
+class TfidfModel:
+    """Frozen transform of a fitted TfidfVectorizer (default tokenizer, l2 norm)
+
+    Holds only the vocabulary and IDF weights, so recommenders pickled with
+    it load and retrieve without importing scikit-learn. Stop words need no
+    handling here: they never enter the fitted vocabulary.
+    """
+
+    def __init__(self, vocabulary, idf, token_pattern=r"(?u)\b\w\w+\b", lowercase=True):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self._tokenize = re.compile(token_pattern).findall
+
+    def __getstate__(self):
+        return {'vocabulary': self.vocabulary, 'idf': self.idf,
+                'token_pattern': self.token_pattern, 'lowercase': self.lowercase}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        if (vectorizer.analyzer != 'word' or vectorizer.ngram_range != (1, 1) or vectorizer.sublinear_tf
+                or vectorizer.norm != 'l2' or not vectorizer.use_idf or vectorizer.tokenizer is not None
+                or vectorizer.preprocessor is not None or vectorizer.binary):
+            raise ValueError("TfidfModel supports word unigrams with idf weights and l2 norm only")
+        vocabulary = {term: int(column) for term, column in vectorizer.vocabulary_.items()}
+        return cls(vocabulary, vectorizer.idf_, vectorizer.token_pattern, vectorizer.lowercase)
+
+    def transform(self, texts):
+        """L2-normalized TF-IDF rows (CSR), equal to TfidfVectorizer.transform"""
+        indptr, indices, counts = [0], [], []
+        for text in texts:
+            if self.lowercase:
+                text = text.lower()
+            row = {}
+            for token in self._tokenize(text):
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    row[column] = row.get(column, 0) + 1
+            for column in sorted(row):
+                indices.append(column)
+                counts.append(row[column])
+            indptr.append(len(indices))
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(counts, dtype=np.float64) * self.idf[indices]
+        indptr = np.asarray(indptr, dtype=np.int32)
+        n_rows, lengths = len(indptr) - 1, np.diff(indptr)
+        norms = np.sqrt(np.bincount(np.repeat(np.arange(n_rows), lengths), weights=data * data, minlength=n_rows))
+        norms[norms == 0.0] = 1.0
+        data /= np.repeat(norms, lengths)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, len(self.idf)))
+
+    def feature_names(self):
+        names = np.empty(len(self.vocabulary), dtype=object)
+        for term, column in self.vocabulary.items():
+            names[column] = term
+        return names
+
+
+def fit_tfidf(texts, **params):
+    """(TfidfModel, feature matrix) fitted on texts; the only place scikit-learn is imported"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(**{**TFIDF_PARAMS, **params})
+    features = vectorizer.fit_transform(texts)
+    return TfidfModel.from_vectorizer(vectorizer), features.tocsr()
@@ -0,0 +1,119 @@
+# text_templates.py - Precompiled Justification and Timeline Text
+import functools
+import json
+import os
+import string
+
+import numpy as np
+
+from scoring import LEVELS
+
+TIMELINES = ('short-term', 'medium-term', 'long-term')  # 1-3, 3-6 and 6-12 months
+
+
+def _timeline(user_level, course_level):
+    if user_level == course_level:
+        return 0
+    if (user_level, course_level) in (('beginner', 'intermediate'), ('intermediate', 'advanced')):
+        return 1
+    return 2
+
+
+# TIMELINES index per (user level, course level code); unknown course levels (code len(LEVELS)) are long-term
+TIMELINE_TABLE = np.array([[_timeline(u, c) for c in LEVELS + [None]] for u in LEVELS], dtype=np.intp)
+
+# Justification tiers: >= 80, >= 60, >= 40 with missing prerequisites, >= 40 without, the rest
+TIERS = ('excellent', 'strong', 'potential', 'solid', 'opportunity')
+EXCELLENT, STRONG, POTENTIAL, SOLID, OPPORTUNITY = range(len(TIERS))
+FIELDS = {'matching', 'new', 'missing'}  # Existing skills used, new skills taught, first two missing prerequisites
+
+JUSTIFICATIONS_EN = {
+    'excellent': "🎯 Excellent fit! You have {matching} required skills. This will add {new} new skills to your toolkit.",
+    'strong': "✅ Strong match. Builds on your {matching} existing skills. You'll learn {new} new technologies.",
+    'potential': "⚠️ Good potential. Learn {new} new skills. Consider brushing up on: {missing}",
+    'solid': "📈 Solid option. Expands your skillset with {new} new technologies.",
+    'opportunity': "🎓 Learning opportunity. Challenges you with {new} new skills. Prepare by learning prerequisites first."
+}
+
+
+def tier_codes(scores, missing_prereqs):
+    """TIERS index per recommendation from its match score and missing prerequisite count"""
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= 80, scores >= 60, (scores >= 40) & (np.asarray(missing_prereqs) > 0), scores >= 40],
+        [EXCELLENT, STRONG, POTENTIAL, SOLID], OPPORTUNITY
+    )
+
+
+def timelines(user_levels, level_codes):
+    """Timeline labels for arrays of user level indices (into LEVELS) and course level codes"""
+    return [TIMELINES[code] for code in TIMELINE_TABLE[user_levels, level_codes].tolist()]
+
+
+class TemplateSet:
+    """Justification templates of one locale, each compiled to a bound str.format once
+
+    A text depends only on its tier and two small counts (plus the missing
+    prerequisites' names for 'potential'), so rendered texts are memoized
+    by those integers and repeated recommendations cost one dict lookup.
+    """
+
+    def __init__(self, justifications, locale='en'):
+        missing = [tier for tier in TIERS if tier not in justifications]
+        if missing:
+            raise ValueError(f"Template set {locale!r} lacks tiers: {missing}")
+        for tier in TIERS:
+            fields = {field for _, field, _, _ in string.Formatter().parse(justifications[tier]) if field}
+            if not fields <= FIELDS:
+                raise ValueError(f"Template {locale}/{tier} uses unknown fields: {sorted(fields - FIELDS)}")
+        self.locale = locale
+        self.justifications = {tier: justifications[tier] for tier in TIERS}
+        self._formats = [self.justifications[tier].format for tier in TIERS]
+        self._texts = {}
+
+    def __getstate__(self):
+        return {'justifications': self.justifications, 'locale': self.locale}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @classmethod
+    def load(cls, path):
+        """Template set from a JSON file: {"locale": "de", "justifications": {tier: template}}"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['justifications'], data.get('locale', os.path.splitext(os.path.basename(path))[0]))
+
+    def render(self, scores, matching, new, missing_prereqs, missing_names):
+        """Justification per recommendation from integer vectors in one pass
+
+        ``missing_names(i)`` returns recommendation i's missing prerequisite
+        names; it is only called for the tier that shows them.
+        """
+        texts, memo, formats = [], self._texts, self._formats
+        tiers = tier_codes(scores, missing_prereqs).tolist()
+        for i, (tier, n_matching, n_new) in enumerate(zip(tiers, np.asarray(matching).tolist(),
+                                                          np.asarray(new).tolist())):
+            if tier == POTENTIAL:
+                texts.append(formats[tier](matching=n_matching, new=n_new, missing=', '.join(missing_names(i)[:2])))
+                continue
+            text = memo.get((tier, n_matching, n_new))
+            if text is None:
+                text = memo[(tier, n_matching, n_new)] = formats[tier](matching=n_matching, new=n_new, missing='')
+            texts.append(text)
+        return texts
+
+
+DEFAULT_TEMPLATES = TemplateSet(JUSTIFICATIONS_EN)
+
+
+@functools.lru_cache(maxsize=None)
+def load_templates(path):
+    """Template set of a JSON file, read once per process"""
+    return TemplateSet.load(path)
+
+
+def configured_templates():
+    """Template set named by SMARTCAREER_TEMPLATES (a JSON file), else the English default"""
+    path = os.environ.get('SMARTCAREER_TEMPLATES')
+    return load_templates(path) if path else DEFAULT_TEMPLATES
@@ -0,0 +1,75 @@
+# user_profile.py - Normalized, Hashable User Profiles
+from skill_vocab import normalize_skill
+
+
+def user_level(skill_count, experience_years):
+    """Determine user skill level based on experience and number of skills"""
+    if skill_count <= 3 or experience_years < 1:
+        return 'beginner'
+    elif skill_count <= 6 or experience_years < 3:
+        return 'intermediate'
+    else:
+        return 'advanced'
+
+
+class UserProfile:
+    """Canonical form of a profile dict with its derived features computed once
+
+    Skills are normalized and deduplicated; the level is derived once from
+    the raw skill count and experience. Two profiles are equal (and hash
+    alike) exactly when every recommendation for them is the same, so a
+    profile can key result caches directly. Treat instances as immutable.
+    """
+
+    __slots__ = ('technical_skills', 'level', 'target_domain', 'major', '_key', '_encoded')
+
+    def __init__(self, technical_skills=(), experience_years=0, target_domain='', major=''):
+        skills = [normalize_skill(skill) for skill in technical_skills]
+        self.technical_skills = tuple(sorted(set(skills)))
+        self.level = user_level(len(skills), experience_years)
+        self.target_domain = (target_domain or '').lower()
+        self.major = (major or '').lower()
+        self._key = (self.technical_skills, self.level, self.target_domain, self.major)
+        self._encoded = None  # (vocabulary, its size, skill ids, skill bitset)
+
+    @classmethod
+    def of(cls, profile):
+        """UserProfile for a profile dict (as in sample_profiles); UserProfiles pass through"""
+        if isinstance(profile, cls):
+            return profile
+        return cls(profile['technical_skills'], profile.get('experience_years', 0),
+                   profile.get('target_domain'), profile.get('major'))
+
+    def __eq__(self, other):
+        return isinstance(other, UserProfile) and self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        return (f"UserProfile(skills={list(self.technical_skills)}, level={self.level!r}, "
+                f"target_domain={self.target_domain!r}, major={self.major!r})")
+
+    def _encode(self, vocabulary):
+        # Recomputed only when the vocabulary has grown, since a new skill may now be known
+        encoded = self._encoded
+        if encoded is None or encoded[0] is not vocabulary or encoded[1] != len(vocabulary):
+            size = len(vocabulary)
+            skill_ids = vocabulary.encode(self.technical_skills)
+            bits = 0
+            for skill_id in skill_ids:
+                bits |= 1 << skill_id
+            encoded = self._encoded = (vocabulary, size, skill_ids, bits)
+        return encoded
+
+    def skill_ids(self, vocabulary):
+        """Sorted vocabulary ids of the user's known skills"""
+        return self._encode(vocabulary)[2]
+
+    def skill_bits(self, vocabulary):
+        """Bitset of the user's known skills"""
+        return self._encode(vocabulary)[3]
+
+    def text(self):
+        """Profile text for TF-IDF retrieval, combined like the course texts"""
+        return f"{' '.join(self.technical_skills)} {self.major} {self.target_domain}"
@@ -0,0 +1,293 @@
+# vector_index.py - Dense Course Vectors with Exact and IVF Nearest-Neighbour Search
+import json
+
+import numpy as np
+from scipy.sparse.linalg import svds
+
+from buffers import ArrayBuffer
+
+EMBEDDING_DIM = 128
+IVF_TRAIN_PER_LIST = 40  # k-means training rows per inverted list
+IVF_ITERATIONS = 10
+SEARCH_CHUNK = 4096  # Rows assigned to centroids per matrix product, bounding temporary memory
+EXACT_BLOCK_SCORES = 1 << 22  # Query x row scores held at once by the exact index (16 MB)
+
+_MAGIC = b'SCVECIX1'
+_ALIGN = 64
+
+
+def _normalize(vectors):
+    """Rows scaled to unit length (all-zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class Projection:
+    """Truncated SVD (LSA) of TF-IDF rows into dense unit vectors
+
+    Cosine similarity of projected rows approximates that of the TF-IDF rows
+    while using a fixed, small number of float32 dimensions per course.
+    """
+
+    def __init__(self, components):
+        self.components = components  # dim x n_features
+
+    @classmethod
+    def fit(cls, features, dim=EMBEDDING_DIM):
+        dim = min(dim, min(features.shape) - 1)
+        if dim < 1:  # Too few courses or terms to factorize: use the terms themselves
+            return cls(np.eye(features.shape[1], dtype=np.float32))
+        _, singular_values, components = svds(features.astype(np.float64), k=dim, random_state=0)
+        return cls(components[np.argsort(-singular_values)].astype(np.float32))
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    def transform(self, features):
+        """Unit float32 vectors for TF-IDF rows (a sparse matrix)"""
+        return _normalize(np.asarray(features @ self.components.T, dtype=np.float32))
+
+
+def _top_k(scores, ids, k):
+    """(ids, scores) of the k highest scores, ties broken by id"""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[keep], ids[keep]
+    order = np.lexsort((ids, -scores))
+    return ids[order], scores[order]
+
+
+def _pad(ids, scores, k):
+    """Fixed-width result rows: missing neighbours are id -1 with score -inf"""
+    padded_ids = np.full(k, -1, dtype=np.int64)
+    padded_scores = np.full(k, -np.inf, dtype=np.float32)
+    padded_ids[:len(ids)], padded_scores[:len(scores)] = ids, scores
+    return padded_ids, padded_scores
+
+
+class VectorIndex:
+    """Inner-product search over unit vectors, one row per catalog course
+
+    Subclasses index the rows they were built from; rows appended later
+    (``extended``) are kept in an exactly-scanned tail until the next
+    rebuild, the same way catalog updates wait for compaction.
+    """
+
+    kind = None
+
+    def __init__(self, n_base, dim, tail=None):
+        self.n_base = n_base
+        self.dim = dim
+        self.tail = tail  # ArrayBuffer of vectors for rows n_base onwards
+
+    def __len__(self):
+        return self.n_base + (self.tail.size if self.tail is not None else 0)
+
+    def extended(self, n_rows, vectors):
+        """Index with ``vectors`` appended as rows n_rows onwards; this index is unchanged"""
+        index = object.__new__(type(self))
+        index.__dict__.update(self.__dict__)
+        tail = self.tail or ArrayBuffer(np.empty((0, self.dim), dtype=np.float32))
+        index.tail = tail.extend(n_rows - self.n_base, np.asarray(vectors, dtype=np.float32))
+        return index
+
+    def search(self, queries, k, **params):
+        """(ids, scores) arrays of shape len(queries) x k, best first; short rows are padded with id -1"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        tail = self.tail.view() if self.tail is not None and self.tail.size else None
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, (row_ids, row_scores) in enumerate(self._search_base(queries, k, **params)):
+            if tail is not None:
+                row_ids = np.concatenate([row_ids, np.arange(self.n_base, self.n_base + len(tail))])
+                row_scores = np.concatenate([row_scores, tail @ queries[i]])
+            ids[i], scores[i] = _pad(*_top_k(row_scores, row_ids, k), k)
+        return ids, scores
+
+    def _search_base(self, queries, k, **params):
+        """Per query, candidate (ids, scores) among the indexed rows; search keeps the best k"""
+        raise NotImplementedError
+
+    def arrays(self):
+        """Named arrays that make up the index, for save_index"""
+        raise NotImplementedError
+
+    def params(self):
+        return {}
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays().values())
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force baseline: every row is scored with float32 vectors"""
+
+    kind = 'exact'
+
+    def __init__(self, vectors, tail=None):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        super().__init__(len(self.vectors), self.vectors.shape[1], tail)
+
+    @classmethod
+    def build(cls, vectors):
+        return cls(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def _search_base(self, queries, k, **params):
+        # Score blocks of queries with one matrix product, keeping each query's k best
+        block = max(1, EXACT_BLOCK_SCORES // max(self.n_base, 1))
+        for start in range(0, len(queries), block):
+            scores = queries[start:start + block] @ self.vectors.T
+            if self.n_base > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+            else:
+                top = np.broadcast_to(np.arange(self.n_base), scores.shape)
+            yield from zip(top, scores)
+
+    def arrays(self):
+        return {'vectors': self.vectors}
+
+    @classmethod
+    def from_arrays(cls, arrays, params, tail=None):
+        return cls(arrays['vectors'], tail)
+
+
+class IVFIndex(VectorIndex):
+    """Inverted file over k-means cells with 8-bit scalar-quantized vectors
+
+    A query scores the n_lists centroids, then only the rows of the n_probe
+    nearest cells, using one byte per dimension. Raising n_probe trades
+    speed for recall; n_probe == n_lists scans every (quantized) row.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self, centroids, offsets, ids, codes, low, scale, n_probe=8, tail=None):
+        self.centroids = centroids  # n_lists x dim, unit length
+        self.offsets = offsets  # Cell l holds positions offsets[l]:offsets[l + 1]
+        self.ids = ids  # Catalog row of each position
+        self.codes = codes  # int8 codes per position, dequantized as (code + 128) * scale + low
+        self.low = low
+        self.scale = scale
+        self.n_probe = n_probe
+        super().__init__(len(ids), centroids.shape[1], tail)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_probe=8, seed=0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_lists = max(1, min(n_lists or int(2 * np.sqrt(len(vectors))), len(vectors)))
+        centroids = cls._train(vectors, n_lists, np.random.RandomState(seed))
+        cells = cls._assign(vectors, centroids)
+        ids = np.argsort(cells, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=n_lists))]).astype(np.int64)
+
+        low = vectors.min(axis=0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        high = vectors.max(axis=0) if len(vectors) else low
+        scale = np.maximum(high - low, 1e-12) / 255
+        codes = (np.rint((vectors[ids] - low) / scale) - 128).astype(np.int8)
+        return cls(centroids, offsets, ids.astype(np.int64), codes, low, scale.astype(np.float32), n_probe)
+
+    @staticmethod
+    def _assign(vectors, centroids):
+        """Nearest centroid (highest inner product) of every row"""
+        cells = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), SEARCH_CHUNK):
+            cells[start:start + SEARCH_CHUNK] = np.argmax(vectors[start:start + SEARCH_CHUNK] @ centroids.T, axis=1)
+        return cells
+
+    @classmethod
+    def _train(cls, vectors, n_lists, rng):
+        """Spherical k-means on a sample; empty cells are re-seeded with random rows"""
+        sample = vectors
+        if len(vectors) > IVF_TRAIN_PER_LIST * n_lists:
+            sample = vectors[rng.choice(len(vectors), IVF_TRAIN_PER_LIST * n_lists, replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):
+            cells = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, cells, sample)
+            empty = np.flatnonzero(np.bincount(cells, minlength=n_lists) == 0)
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+            centroids = _normalize(sums)
+        return centroids
+
+    def _search_base(self, queries, k, n_probe=None):
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        offsets = self.offsets
+        for query, cells in zip(queries, probes):
+            positions = np.concatenate([np.arange(offsets[c], offsets[c + 1]) for c in cells.tolist()])
+            # q . v ~ (q * scale) . code + q . (128 * scale + low); the second term is the same for every row
+            scores = self.codes[positions] @ (query * self.scale) + query @ (128 * self.scale + self.low)
+            yield self.ids[positions], scores.astype(np.float32)
+
+    def arrays(self):
+        return {'centroids': self.centroids, 'offsets': self.offsets, 'ids': self.ids, 'codes': self.codes,
+                'low': self.low, 'scale': self.scale}
+
+    def params(self):
+        return {'n_probe': self.n_probe}
+
+    @classmethod
+    def from_arrays(cls, arrays, params, tail=None):
+        return cls(arrays['centroids'], arrays['offsets'], arrays['ids'], arrays['codes'], arrays['low'],
+                   arrays['scale'], params.get('n_probe', 8), tail)
+
+
+VECTOR_INDEXES = {'exact': ExactIndex, 'ivf': IVFIndex}
+
+
+def build_index(kind, vectors, **params):
+    """Build a registered index backend ('exact' or 'ivf') over unit vectors"""
+    if kind not in VECTOR_INDEXES:
+        raise ValueError(f"Unknown vector index {kind!r}; choose from {sorted(VECTOR_INDEXES)}")
+    return VECTOR_INDEXES[kind].build(vectors, **params)
+
+
+def save_index(index, path):
+    """Write an index (tail rows included) to one file whose arrays load memory-mapped
+
+    Layout: magic, header length, JSON header, then each array's raw bytes
+    at a 64-byte aligned offset.
+    """
+    arrays = dict(index.arrays())
+    if index.tail is not None and index.tail.size:
+        arrays['tail'] = index.tail.view()
+    header, offset = {'kind': index.kind, 'params': index.params(), 'arrays': {}}, 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    encoded = json.dumps(header).encode('utf-8')
+    start = -(-(len(_MAGIC) + 8 + len(encoded)) // _ALIGN) * _ALIGN
+    with open(path, 'wb') as f:
+        f.write(_MAGIC + len(encoded).to_bytes(8, 'little') + encoded)
+        for name, array in arrays.items():
+            f.seek(start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+    return path
+
+
+def load_index(path, mmap=True):
+    """Index saved by save_index; with ``mmap`` its arrays are read-only views of the file"""
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a vector index file")
+        length = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(length).decode('utf-8'))
+    start = -(-(len(_MAGIC) + 8 + length) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+        if not np.prod(shape):
+            arrays[name] = np.empty(shape, dtype=dtype)
+        elif mmap:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=start + spec['offset'], shape=shape)
+        else:
+            with open(path, 'rb') as f:
+                f.seek(start + spec['offset'])
+                arrays[name] = np.frombuffer(f.read(dtype.itemsize * int(np.prod(shape))), dtype=dtype).reshape(shape)
+    tail = arrays.pop('tail', None)
+    tail = ArrayBuffer(tail, np.float32) if tail is not None else None
+    return VECTOR_INDEXES[header['kind']].from_arrays(arrays, header['params'], tail)